@@ -0,0 +1,79 @@
+"""Compare full CPU games played on `Board` and `BitBoard`.
+
+Every game is replayed from the same seed on both backends, so the outcomes must match exactly. The time is
+that of the whole games, strategy and turn bookkeeping included, not only of the board.
+usage: python -m bench.bitboard [games] [players]
+"""
+import json
+import sys
+import time
+import timeit
+
+from lib.bitboard import BitBoard
+from lib.model import Board
+from sim.cpu import CPUSim
+
+
+def play(board_cls, players, seed):
+    sim = CPUSim(players, board_cls=board_cls, seed=seed)
+    start = time.perf_counter()
+    turns = sim.run()
+    elapsed = time.perf_counter() - start
+    winner, sequences = sim.game.winner()
+    return elapsed, (turns, winner.id, [tuple(coord for coord, _ in s) for s in sequences])
+
+
+def compare(n, players=2, seed=0):
+    """Play each seed on both backends back to back, alternating which goes first, so that drift in the
+    machine's speed affects both alike
+    """
+    backends = (Board, BitBoard)
+    elapsed = {board_cls: 0.0 for board_cls in backends}
+    turns = 0
+    for i in range(n):
+        outcomes = {}
+        for board_cls in (backends if i % 2 == 0 else backends[::-1]):
+            seconds, outcomes[board_cls] = play(board_cls, players, seed + i)
+            elapsed[board_cls] += seconds
+        if outcomes[BitBoard] != outcomes[Board]:
+            raise RuntimeError(f"{BitBoard.__name__} diverged from {Board.__name__} in game {seed + i}")
+        turns += outcomes[Board][0]
+    results = {
+        board_cls.__name__: {"time": elapsed[board_cls], "turns": turns, "time_per_turn": elapsed[board_cls] / turns}
+        for board_cls in backends
+    }
+    results["speedup"] = elapsed[Board] / elapsed[BitBoard]
+    results["operations"] = compare_operations(players)
+    return results
+
+
+def compare_operations(players, repeat=1000, seed=0):
+    """Time the backend-specific operations on the final position of one seeded game
+    """
+    sim = CPUSim(players, seed=seed)
+    sim.run()
+    cells = sim.game.board.cells
+    player = sim.game.players[0]
+    hand = list(player.hand)
+    results = {}
+    for board_cls in (Board, BitBoard):
+        board = board_cls(cells)
+        results[board_cls.__name__] = {
+            "_all_occupied": timeit.timeit(lambda: board._all_occupied(player), number=repeat) / repeat,
+            "_all_unoccupied": timeit.timeit(board._all_unoccupied, number=repeat) / repeat,
+            "_rebuild_sequences": timeit.timeit(board._rebuild_sequences, number=repeat) / repeat,
+            "hand_moves": timeit.timeit(lambda: board.hand_moves(hand, player), number=repeat) / repeat,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        games = int(sys.argv[1])
+    except (IndexError, ValueError):
+        games = 50
+    try:
+        player_count = int(sys.argv[2])
+    except (IndexError, ValueError):
+        player_count = 2
+    print(json.dumps(compare(games, player_count), indent=4))
@@ -0,0 +1,311 @@
+"""Time the engine's hot paths and compare them against a stored baseline.
+
+Every case is seeded, so two runs time exactly the same work. The dense boards are built by claiming cells
+for two players at random until only a tenth of them stay open ("random"), and by giving each player
+alternate rows ("rows"), which maximises the number of complete, overlapping lines to pick sequences from.
+
+Results are written as JSON, one entry per case with the best and median time of a single operation. Every
+repeat of a case is paired with a repeat of a fixed pure Python calibration workload, and a case's "relative"
+time is the median of its times over the calibration's, which absorbs most of the difference between machines
+and between a loaded and an idle one.
+
+Timings only compare on the machine they were taken on, so no baseline is kept in the repository, each machine
+records its own. To check a change for regressions:
+
+    git stash                                  # or check out the commit the change starts from
+    python -m bench.engine --save-baseline     # writes bench/baseline.local.json, ignored by git
+    git stash pop
+    python -m bench.engine                     # exits with 1 when a case got slower
+
+A case fails when its relative time is more than `--tolerance` above the baseline's, by default 15%. Paired
+medians of repeated runs on an idle machine stayed within 10% of each other; on a busy machine, rerun or raise
+the tolerance. Record a new baseline whenever the machine, the Python version or the cases change.
+
+usage: python -m bench.engine [-o results.json] [--baseline PATH] [--save-baseline] [--tolerance 0.15] [-k name]
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lib import matrix
+from lib.game import Game
+from lib.model import Board, DECK, Move
+from sim.cpu import CPUSim
+from sim.strategy import RandomStrategy, StrategyProvider
+
+BASELINE = Path(__file__).with_name("baseline.local.json")
+
+Case = Callable[[], Tuple[Callable[[], object], int]]  # returns the timed callable and the operations it does
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str):
+    def register(setup: Case) -> Case:
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def dense_game(fill: str, seed=0) -> Game:
+    """A two player game whose board is crafted as described in the module docstring"""
+    game = Game(["Abbott", "Bionicle"], seed=seed)
+    board = game.board
+    cells = [(r, c) for r, row in enumerate(board.cells) for c, cell in enumerate(row) if not cell.is_wild]
+    if fill == "rows":
+        owners = {(r, c): game.players[r % 2] for r, c in cells}
+    else:
+        rng = random.Random(seed)
+        claimed = rng.sample(cells, len(cells) * 9 // 10)
+        owners = {coordinate: game.players[i % 2] for i, coordinate in enumerate(claimed)}
+    for (r, c), player in owners.items():
+        board.claim_cell(player, board.cells[r][c].card, r, c)
+    return game
+
+
+def recorded_game(players=2, seed=0) -> Tuple[Game, List[tuple]]:
+    """A fresh game and the turns a seeded CPU game played on it: (seat, None) when the seat only exchanged its
+    dead cards and passed, (seat, card, row, column) otherwise
+    """
+    strategies = StrategyProvider.constant(RandomStrategy(random.Random(seed)))
+    sim = CPUSim(players, strategies, seed=seed)  # the game rng only shuffles, so a new game draws the same cards
+    start = sim.game.clone()
+    turns = []
+    take_turn = sim.game.take_turn
+
+    def record(row, column, card, player):
+        turns[-1] = (sim.game.players.index(player), card, row, column)
+        return take_turn(row, column, card, player)
+
+    sim.game.take_turn = record
+    while not sim.game.winner():
+        turns.append((sim.game.turns_started % players, None))
+        sim.play_turn()
+    return start, turns
+
+
+def _replay(start: Game, turns: List[tuple]) -> Game:
+    game = start.clone()
+    for seat, *move in turns:
+        player = game.next_player()
+        game.exchange_dead_cards(player)
+        if move[0] is not None:
+            card, row, column = move
+            game.take_turn(row, column, card, player)
+    return game
+
+
+@case("Game.winner/random")
+def _winner_random():
+    return _winner(dense_game("random"))
+
+
+@case("Game.winner/rows")
+def _winner_rows():
+    return _winner(dense_game("rows"))
+
+
+def _winner(game: Game):
+    """Each player removing one of the other's chips, and the winner check after that. The removals invalidate
+    both players' cached sequences, so the selection itself is timed, and are undone after the check.
+    """
+    board = game.board
+    jack = next(card for card in DECK if card.is_one_eyed_jack)
+    removals = [Move(player, jack, *board.find_valid_cells(jack, player)[0]) for player in game.players]
+
+    def winner():
+        for move in removals:
+            board.apply(move)
+        found = game.winner()
+        for _ in removals:
+            board.undo()
+        return found
+    return winner, 1
+
+
+@case("Board.find_valid_cells")
+def _find_valid_cells():
+    game = dense_game("random")
+    board, player = game.board, game.players[0]
+    cards = [card for card in DECK if not board.is_dead_card(card, player)]  # dead cards raise
+
+    def find_valid_cells():
+        for card in cards:
+            board.find_valid_cells(card, player)
+    return find_valid_cells, len(cards)
+
+
+@case("Game.take_turn")
+def _take_turn():
+    """A whole recorded game replayed on a clone of its start, including its dead card exchanges"""
+    start, turns = recorded_game()
+    return lambda: _replay(start, turns), sum(1 for turn in turns if turn[1] is not None)
+
+
+@case("Game.clone")
+def _clone():
+    start, _ = recorded_game()
+    return start.clone, 1
+
+
+@case("matrix.get_valid_sequences/random")
+def _get_valid_sequences_random():
+    return _get_valid_sequences(dense_game("random"))
+
+
+@case("matrix.get_valid_sequences/rows")
+def _get_valid_sequences_rows():
+    return _get_valid_sequences(dense_game("rows"))
+
+
+def _get_valid_sequences(game: Game):
+    cells, player = game.board.cells, game.players[0]
+
+    def condition(cell):
+        return cell.is_wild or cell.player == player
+
+    return lambda: matrix.get_valid_sequences(cells, Board.SEQUENCE_LENGTH, condition, game.win_count), 1
+
+
+@case("Request.serialize")
+def _request():
+    from net.protocol import Action, Request
+
+    request = Request(Action.MOVE, (DECK[0], (1, 2)), "0")
+    return lambda: Request.deserialize(Request.serialize(request)), 1
+
+
+@case("Reply.serialize")
+def _reply():
+    """A poll reply, carrying a player's view of a dense game"""
+    from net.protocol import Reply, Status
+
+    game = dense_game("random")
+    reply = Reply(Status.ack, game.get_state_perspective(game.players[0], game.players[1]))
+    return lambda: Reply.deserialize(Reply.serialize(reply)), 1
+
+
+@case("ConsoleGame._render_board")
+def _render_board():
+    """Build the board table and render it to text"""
+    from rich.console import Console
+    from console import ConsoleGame
+
+    game = dense_game("random")
+    player = game.players[0]
+    console_game = ConsoleGame()
+    output = Console(file=io.StringIO(), width=160, color_system="truecolor")
+    moves = game.board.find_valid_cells(DECK[0], player)
+
+    def render_board():
+        output.file.seek(0)
+        output.file.truncate()
+        output.print(console_game._render_board(game, player, moves))
+    return render_board, 1
+
+
+@case("CPUSim.run")
+def _cpu_sim_run():
+    """Full two player games, seeded so every repeat plays the same one"""
+    def run():
+        return CPUSim(2, seed=0).run()
+    return run, 1
+
+
+def calibration_workload(size=2000):
+    """Dict, tuple and attribute heavy pure Python, like the engine, that no change to this repo affects"""
+    rng = random.Random(0)
+    items = [(rng.randrange(100), rng.randrange(100)) for _ in range(size)]
+    counts = {}
+    for item in sorted(items):
+        counts[item] = counts.get(item, 0) + 1
+    return max(counts.items(), key=lambda kv: kv[1])
+
+
+def _calls(timer: timeit.Timer, min_time: float) -> int:
+    number, _ = timer.autorange()
+    return max(1, int(number * min_time / 0.2))
+
+
+def time_case(fn: Callable[[], object], ops: int, repeat: int, min_time: float) -> dict:
+    """Time fn `repeat` times, each repeat right after one of the calibration workload, with as many calls per
+    repeat as fit in about min_time seconds
+    """
+    timer, calibration = timeit.Timer(fn), timeit.Timer(calibration_workload)
+    number, calibration_number = _calls(timer, min_time), _calls(calibration, min_time)
+    times, ratios = [], []
+    for _ in range(repeat):
+        reference = calibration.timeit(calibration_number) / calibration_number
+        times.append(timer.timeit(number) / (number * ops))
+        ratios.append(times[-1] / reference)
+    return {
+        "best": min(times),
+        "median": statistics.median(times),
+        "calls": number,
+        "ops_per_call": ops,
+        "relative": statistics.median(ratios),
+    }
+
+
+def run_cases(names: List[str], repeat=15, min_time=0.05) -> Dict[str, dict]:
+    return {name: time_case(*CASES[name](), repeat, min_time) for name in names}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> Dict[str, dict]:
+    """Ratio of each case's relative time to the baseline's, for cases both runs have
+    """
+    comparison = {}
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result["relative"] / baseline[name]["relative"]
+            comparison[name] = {"ratio": ratio, "regression": ratio > 1 + tolerance}
+    return comparison
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "platform": platform.platform()}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the engine's hot paths")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=str(BASELINE), help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed slowdown of the relative time, 0.15 for 15%%")
+    parser.add_argument("-k", dest="filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    names = [name for name in CASES if args.filter in name]
+    report = {"environment": environment(), "results": run_cases(names, args.repeat)}
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=4) + "\n")
+        print(f"Saved the baseline to {baseline_path}", file=sys.stderr)
+    elif baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())
+        report["baseline"] = str(baseline_path)
+        report["comparison"] = compare(report["results"], baseline["results"], args.tolerance)
+    else:
+        print(f"No baseline at {baseline_path}, nothing to compare against. Record one on this machine from the "
+              f"code to compare with: python -m bench.engine --save-baseline", file=sys.stderr)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=4) + "\n")
+    print(json.dumps(report, indent=4))
+    regressions = [name for name, c in report.get("comparison", {}).items() if c["regression"]]
+    if regressions:
+        print(f"Slower than the baseline: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
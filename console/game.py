@@ -8,7 +8,7 @@ from rich.text import Text
 from console import utils
 from console.lobby import ConsoleLobby
 from lib.game import Game
-from lib.model import Player, InvalidCellSelection, DeadCardError, Card
+from lib.model import Player, InvalidCellSelection, Card
 
 
 class ConsoleGame:
@@ -38,31 +38,43 @@ class ConsoleGame:
         return game.turn_count
 
     def _handle_turn(self, game: Game, current_player: Player):
-        card, moves = self._select_card_to_play(game, current_player)
+        for card in game.exchange_dead_cards(current_player):
+            self._echo(f"Exchanging dead card: {card}")
         while True:
+            turn = self._choose_turn(game, current_player)
+            if turn is None:
+                return None
+            card, (row, column) = turn
             try:
-                move = self._select_move_to_make(game, current_player, moves)
-                row, column = move
                 game.take_turn(row, column, card, current_player)
-                return (card, move)
+                return turn
             except InvalidCellSelection as e:
                 continue
 
+    def _choose_turn(self, game: Game, current_player: Player):
+        """Prompt for a playable card and its cell without playing it, or return None when nothing is playable.
+        Dead cards are not offered, exchanging them is up to whoever holds the deck.
+        """
+        card, moves = self._select_card_to_play(game, current_player)
+        if card is None:
+            self._echo(f"{current_player} has no playable cards and passes")
+            return None
+        return card, self._select_move_to_make(game, current_player, moves)
+
     def _prompt_choice(self, prompt: str, options: list, render: Callable[[Any], str] = str):
         return utils.prompt_choice(prompt, options, render, self._echo)
 
     def _select_card_to_play(self, game: Game, current_player: Player):
-        while True:
-            card = self._prompt_choice(
-                "Select a card to play",
-                current_player.hand,
-                self._card_text
-            )
-            try:
-                return card, game.board.find_valid_cells(card, current_player)
-            except DeadCardError:
-                self._echo(f"Exchanging dead card: {card}")
-                game.exchange_dead_card(current_player, card)
+        hand_moves = game.legal_moves(current_player)
+        playable = [card for card in current_player.hand if card in hand_moves.moves]
+        if not playable:
+            return None, []
+        card = self._prompt_choice(
+            "Select a card to play",
+            playable,
+            self._card_text
+        )
+        return card, hand_moves.moves[card]
 
     def _card_text(self, card: Card):
         text = Text(str(card))
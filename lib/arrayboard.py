@@ -0,0 +1,148 @@
+"""NumPy board engine for checking many boards at once.
+
+Boards are encoded as int8 arrays: 0 is an open cell, WILD a corner and 1..P the players in the order the
+board first saw them claim a cell. Stack encoded boards into an N x ROWS x COLUMNS array to evaluate them
+in a single call.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from lib.model import Board, Player
+
+OPEN = 0
+WILD = -1
+
+
+class ArrayBoard(Board):
+    """Board that mirrors cell ownership in an int8 array, see `encode`
+    """
+
+    def __init__(self, cells):
+        self.array = np.zeros((self.ROWS, self.COLUMNS), dtype=np.int8)
+        self.players: List['Player'] = []
+        self._values: Dict['Player', int] = {}
+        super(ArrayBoard, self).__init__(cells)
+
+    def value_for(self, player: 'Player') -> int:
+        value = self._values.get(player)
+        if value is None:
+            self.players.append(player)
+            value = self._values[player] = len(self.players)
+        return value
+
+    def player_for(self, value: int) -> Optional['Player']:
+        return self.players[value - 1] if value > 0 else None
+
+    def clone(self) -> 'ArrayBoard':
+        board = super(ArrayBoard, self).clone()
+        board.array = self.array.copy()
+        board.players = list(self.players)
+        board._values = dict(self._values)
+        return board
+
+    def __getstate__(self):
+        state = super(ArrayBoard, self).__getstate__()
+        state["players"] = self.players
+        return state
+
+    def __setstate__(self, state):
+        super(ArrayBoard, self).__setstate__(state)
+        if self.players != state["players"]:  # number the players as before, rather than in the order of the cells
+            self.players = []
+            self._values = {}
+            for player in state["players"]:
+                self.value_for(player)
+            self._rebuild_sequences()
+
+    def _cell_changed(self, coordinate, previous, current):
+        self.array[coordinate] = OPEN if current is None else self.value_for(current)
+        super(ArrayBoard, self)._cell_changed(coordinate, previous, current)
+
+    def _rebuild_sequences(self):
+        self.array[:] = OPEN
+        for r, row in enumerate(self.cells):
+            for c, cell in enumerate(row):
+                if cell.is_wild:
+                    self.array[r, c] = WILD
+                elif cell.is_occupied:
+                    self.array[r, c] = self.value_for(cell.player)
+        super(ArrayBoard, self)._rebuild_sequences()
+
+
+def encode(board: Board, players: Sequence['Player']) -> np.ndarray:
+    """Encode any board with players numbered 1..P in the given order
+    """
+    values = {player: i for i, player in enumerate(players, 1)}
+    array = np.zeros((board.ROWS, board.COLUMNS), dtype=np.int8)
+    for r, row in enumerate(board.cells):
+        for c, cell in enumerate(row):
+            if cell.is_wild:
+                array[r, c] = WILD
+            elif cell.is_occupied:
+                array[r, c] = values[cell.player]
+    return array
+
+
+def sequence_counts(boards: np.ndarray, players: int, sequence_length: int = Board.SEQUENCE_LENGTH) -> np.ndarray:
+    """Count the distinct sequences (sharing at most one cell) held by each player of each board.
+
+    :param boards: N x ROWS x COLUMNS stack of encoded boards
+    :param players: number of player values to evaluate, 1..players
+    :return: N x players array of counts, the same maximum `matrix.get_valid_sequences` selects
+    """
+    values = np.arange(1, players + 1, dtype=np.int8).reshape(1, players, 1, 1)
+    stacked = boards[:, np.newaxis, :, :]
+    owned = (stacked == values) | (stacked == WILD)  # N x P x ROWS x COLUMNS
+    N = sequence_length
+    rows, columns = owned.shape[-2:]
+    start_rows, start_columns = rows - N + 1, columns - N + 1
+    horizontal = sliding_window_view(owned, N, axis=-1).all(axis=-1)
+    vertical = sliding_window_view(owned, N, axis=-2).all(axis=-1)
+    diagonal = np.ones(owned.shape[:-2] + (start_rows, start_columns), dtype=bool)
+    anti_diagonal = diagonal.copy()
+    for i in range(N):
+        diagonal &= owned[..., i:i + start_rows, i:i + start_columns]
+        anti_diagonal &= owned[..., i:i + start_rows, N - 1 - i:N - 1 - i + start_columns]
+    return (
+        _distinct_count(horizontal, 0, 1, N - 1)
+        + _distinct_count(vertical, 1, 0, N - 1)
+        + _distinct_count(diagonal, 1, 1, N - 1)
+        + _distinct_count(anti_diagonal, 1, -1, N - 1)
+    )
+
+
+def winners(boards: np.ndarray, players: int, win_count: int) -> np.ndarray:
+    """Return the winning player value of each board, or OPEN where nobody has `win_count` sequences
+    """
+    counts = sequence_counts(boards, players)
+    best = counts.argmax(axis=-1)
+    won = np.take_along_axis(counts, best[:, np.newaxis], axis=-1)[:, 0] >= win_count
+    return np.where(won, best + 1, OPEN)
+
+
+def _distinct_count(windows: np.ndarray, dr: int, dc: int, gap: int) -> np.ndarray:
+    """Count complete windows kept by the greedy track selection in `matrix._distinct_sequences`.
+
+    windows[..., r, c] marks the complete line starting at (r, c), the next line on its track starts at
+    (r + dr, c + dc). Within a run of consecutive complete windows every `gap`-th one is kept.
+    """
+    position = np.zeros(windows.shape, dtype=np.int16)
+    if dr == 0:
+        previous = np.zeros(windows.shape[:-1], dtype=np.int16)
+        for c in range(windows.shape[-1]):
+            previous = position[..., c] = (previous + 1) * windows[..., c]
+    else:
+        previous = np.zeros(windows.shape[:-2] + windows.shape[-1:], dtype=np.int16)
+        for r in range(windows.shape[-2]):
+            shifted = np.zeros_like(previous)
+            if dc == 1:
+                shifted[..., 1:] = previous[..., :-1]
+            elif dc == -1:
+                shifted[..., :-1] = previous[..., 1:]
+            else:
+                shifted = previous
+            previous = position[..., r, :] = (shifted + 1) * windows[..., r, :]
+    kept = windows & ((position - 1) % gap == 0)
+    return kept.sum(axis=(-2, -1))
@@ -0,0 +1,177 @@
+import functools
+from typing import Dict, List, Set, Tuple
+
+from lib import matrix, zobrist
+from lib.model import Board, Card, DeadCardError, HandMoves, Player, Rank
+
+
+class LineMasks:
+    """Integer masks for every line of a `matrix.LineTable`, bit index is row * columns + column
+    """
+
+    def __init__(self, rows: int, columns: int, sequence_length: int):
+        table = matrix.line_table(rows, columns, sequence_length)
+        self.full: int = (1 << (rows * columns)) - 1
+        self.coordinates: Tuple[matrix.Coordinate, ...] = tuple(
+            (r, c) for r in range(rows) for c in range(columns)
+        )
+        self.by_line: Dict[matrix.Line, int] = {
+            line: _mask_of(line, columns) for line in table.lines
+        }
+        # the lines through each coordinate, paired with their masks
+        self.by_coordinate: Dict[matrix.Coordinate, Tuple[Tuple[matrix.Line, int], ...]] = {
+            coord: tuple((line, self.by_line[line]) for line in lines)
+            for coord, lines in table.by_coordinate.items()
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def line_masks(rows: int, columns: int, sequence_length: int) -> LineMasks:
+    return LineMasks(rows, columns, sequence_length)
+
+
+def _mask_of(coordinates, columns: int) -> int:
+    mask = 0
+    for r, c in coordinates:
+        mask |= 1 << (r * columns + c)
+    return mask
+
+
+class BitBoard(Board):
+    """Board that keeps cell ownership as one integer mask per player, plus masks of the occupied cells, the
+    wild corners and each card's cells. Move generation, dead card checks and sequence detection are integer
+    operations on those masks, and replace the open and occupied cell sets `Board` keeps, which stay empty.
+    Results, including the order of the moves, are the same as `Board`'s.
+    """
+
+    def __init__(self, cells):
+        self._line_masks = line_masks(self.ROWS, self.COLUMNS, self.SEQUENCE_LENGTH)
+        self._wild = _mask_of(
+            [(r, c) for r, row in enumerate(cells) for c, cell in enumerate(row) if cell.is_wild], self.COLUMNS
+        )
+        self._card_masks = _card_masks(tuple(tuple(cell.card for cell in row) for row in cells), self.COLUMNS)
+        self._occupied = 0
+        self._masks: Dict['Player', int] = {}
+        super(BitBoard, self).__init__(cells)
+
+    def player_mask(self, player: 'Player') -> int:
+        return self._masks.get(player, 0)
+
+    @property
+    def _open_mask(self) -> int:
+        return self._line_masks.full & ~(self._occupied | self._wild)
+
+    def clone(self) -> 'BitBoard':
+        board = super(BitBoard, self).clone()
+        board._masks = dict(self._masks)
+        return board
+
+    def _update_moves(self, coordinate, previous, current):
+        bit = 1 << (coordinate[0] * self.COLUMNS + coordinate[1])
+        if previous is not None:
+            self._masks[previous] &= ~bit
+            self._occupied &= ~bit
+        if current is not None:
+            self._masks[current] = self._masks.get(current, 0) | bit
+            self._occupied |= bit
+
+    def _rebuild_moves(self):
+        self._occupied = 0
+        self._masks.clear()
+        self.zobrist = 0
+        for r, row in enumerate(self.cells):
+            for c, cell in enumerate(row):
+                if cell.is_occupied:
+                    self._update_moves((r, c), None, cell.player)
+                    self.zobrist ^= zobrist.key((r, c), cell.player.id)
+
+    def _update_sequences(self, coordinate, previous, current):
+        if previous is not None and previous in self._sequences:
+            self._sequences[previous].difference_update(self._lines_by_cell[coordinate])
+            self._invalidate_selected(previous)
+        if current is not None:
+            reach = self._masks[current] | self._wild
+            sequences = self._sequences[current]
+            for line, mask in self._line_masks.by_coordinate[coordinate]:
+                if reach & mask == mask:
+                    sequences.add(line)
+            self._invalidate_selected(current)
+
+    def _line_complete(self, line, player):
+        mask = self._line_masks.by_line[line]
+        return (self._masks.get(player, 0) | self._wild) & mask == mask
+
+    def _rebuild_sequences(self):
+        self._sequences.clear()
+        self._selected.clear()
+        for player, mask in self._masks.items():
+            reach = mask | self._wild
+            self._sequences[player] = {
+                line for line, line_mask in self._line_masks.by_line.items() if reach & line_mask == line_mask
+            }
+
+    def _moves_mask(self, card: 'Card', player: 'Player') -> int:
+        if card.rank == Rank.JACK:
+            if card.is_one_eyed_jack:
+                return self._occupied & ~self._masks.get(player, 0)
+            return self._open_mask
+        return self._card_masks.get(card, 0) & self._open_mask
+
+    def find_valid_cells(self, card: 'Card', player: 'Player'):
+        cells = self._coordinates_of(self._moves_mask(card, player))
+        if not cells:
+            raise DeadCardError(f"No valid moves found for {card}")
+        return cells
+
+    def hand_moves(self, hand: List['Card'], player: 'Player') -> HandMoves:
+        moves = {}
+        dead = []
+        for card in hand:
+            cells = moves.get(card)
+            if cells is None:
+                cells = moves[card] = self._coordinates_of(self._moves_mask(card, player))
+            if not cells:
+                dead.append(card)
+        return HandMoves(moves={card: cells for card, cells in moves.items() if cells}, dead=dead)
+
+    def is_dead_card(self, card: 'Card', player: 'Player') -> bool:
+        return not self._moves_mask(card, player)
+
+    def cells_needing(self, player: 'Player', k: int) -> Set['matrix.Coordinate']:
+        open_mask = self._open_mask
+        mask = 0
+        for line in self.lines_needing(player, k):
+            mask |= self._line_masks.by_line[line]
+        return set(self._coordinates_of(mask & open_mask))
+
+    def blocking_cells(self, player: 'Player') -> Set['matrix.Coordinate']:
+        cells = set()
+        for opponent, mask in self._masks.items():
+            if opponent != player and mask:
+                cells |= self.completing_cells(opponent)
+        return cells
+
+    def _all_occupied(self, player: 'Player'):
+        return self._coordinates_of(self._occupied & ~self._masks.get(player, 0))
+
+    def _all_unoccupied(self):
+        return self._coordinates_of(self._open_mask)
+
+    def _coordinates_of(self, mask: int) -> List[matrix.Coordinate]:
+        coordinates = self._line_masks.coordinates
+        moves = []
+        while mask:
+            low = mask & -mask
+            moves.append(coordinates[low.bit_length() - 1])
+            mask ^= low
+        return moves
+
+
+@functools.lru_cache(maxsize=None)
+def _card_masks(layout, columns: int) -> Dict['Card', int]:
+    """Mask of the cells showing each card of a layout, cached so that boards sharing a layout share it"""
+    masks: Dict['Card', int] = {}
+    for r, row in enumerate(layout):
+        for c, card in enumerate(row):
+            masks[card] = masks.get(card, 0) | 1 << (r * columns + c)
+    return masks
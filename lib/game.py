@@ -1,10 +1,10 @@
 import collections
-import itertools
+import copy
 import random
 from dataclasses import dataclass, field
-from typing import List, Union, Tuple, Optional
+from typing import List, Union, Tuple, Optional, Type
 
-from lib.model import Player, Card, generate_deck, Board, Color
+from lib.model import Player, Card, generate_deck, Board, Color, HandMoves, Deck
 
 
 @dataclass
@@ -21,10 +21,31 @@ class PublicGameState:
     players: List[PublicPlayer]
     board: Board
     current_player_turn: Player
+    board_hash: int = 0  # Board.zobrist, equal hashes mean the board did not change
+
+
+class GameListener:
+    """Receives the card events of a `Game` it was added to with `Game.add_listener`. Every player sees played
+    and exchanged cards and reshuffles, only the drawing player sees the card drawn.
+    """
+
+    def card_played(self, player: Player, card: Card, row: int, column: int):
+        pass
+
+    def dead_card_exchanged(self, player: Player, card: Card):
+        pass
+
+    def card_drawn(self, player: Player, card: Card):
+        pass
+
+    def reshuffled(self):
+        """The draw pile ran out and the discard pile, shuffled, became the new draw pile"""
+        pass
 
 
 class Game:
-    def __init__(self, players: Union[List[str], List[Player]]):
+    def __init__(self, players: Union[List[str], List[Player]], board_cls: Type[Board] = Board,
+                 seed: Optional[int] = None):
         self.players: List[Player] = (
             [Player(str(i), name) for i, name in enumerate(players)]
             if isinstance(players[0], str)  # string names
@@ -37,19 +58,68 @@ class Game:
         self._players_by_id = {
             p.id: p for p in self.players
         }
-        self._turn_order = itertools.cycle(self.players)
-        self.win_count = 2 if len(self.players) < 3 else 1
-        self.board = Board.new_board()
-        self._deck: List[Card] = Game.new_deck()
+        self._turns_started = 0
+        self._listeners: List[GameListener] = []
+        self.win_count = Game.win_count_for(len(self.players))
+        self.board = board_cls.new_board()
+        # a game is fully determined by its seed, when not given one is drawn from the global random state
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
+        self._deck: Deck = Game.new_deck(self.rng)
         self._deal_initial_hands()
-        self._discard_pile = []
         self.turn_count = 0
 
+    @staticmethod
+    def win_count_for(player_count: int) -> int:
+        return 2 if player_count < 3 else 1
+
     def color_for_player(self, player):
         return self._colors.get(player)
 
+    @property
+    def turns_started(self) -> int:
+        """Turns handed out by `next_player`, including the ones passed without playing a card
+        """
+        return self._turns_started
+
     def next_player(self) -> Player:
-        return next(self._turn_order)
+        player = self.players[self._turns_started % len(self.players)]
+        self._turns_started += 1
+        return player
+
+    def clone(self) -> 'Game':
+        """Copy the game for lookahead. Only the board occupancy, hands, deck, discard pile and rng are copied,
+        cards, the card layout and line tables are shared with the original.
+        """
+        game = copy.copy(self)
+        game.players = []
+        for player in self.players:
+            clone = copy.copy(player)
+            clone.hand = list(player.hand)
+            game.players.append(clone)
+        game._colors = {clone: self._colors[player] for clone, player in zip(game.players, self.players)}
+        game._players_by_id = {p.id: p for p in game.players}
+        game._listeners = []  # lookahead moves are not events
+        game.board = self.board.clone()
+        game.rng = random.Random()
+        game.rng.setstate(self.rng.getstate())
+        game._deck = self._deck.copy(game.rng)
+        return game
+
+    @property
+    def discards(self) -> List[Card]:
+        return self._deck.discards
+
+    @property
+    def draw_pile(self) -> List[Card]:
+        """The cards left to draw, in drawing order, hidden from the players"""
+        return self._deck.remaining
+
+    def add_listener(self, listener: GameListener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: GameListener):
+        self._listeners.remove(listener)
 
     def get_player(self, player_id):
         return self._players_by_id.get(player_id)
@@ -63,18 +133,41 @@ class Game:
         return (winning, sequences[winning]) if high_count >= self.win_count else None
 
     def take_turn(self, row, column, card: Card, player: Player):
-        cell = self.board.get_cell(row, column)
+        self.board.get_cell(row, column)  # validate before the card leaves the hand
         player.use_card(card)
-        result = Board.claim_cell(player, card, cell)
-        self._discard_pile.append(card)
-        player.draw_card(self.draw_card)
+        result = self.board.claim_cell(player, card, row, column)
+        self._deck.discard(card)
+        for listener in self._listeners:
+            listener.card_played(player, card, row, column)
+        self._draw_for(player)
         self.turn_count += 1
         return result
 
     def exchange_dead_card(self, player, card):
         player.use_card(card)
-        self._discard_pile.append(card)
+        self._deck.discard(card)
+        for listener in self._listeners:
+            listener.dead_card_exchanged(player, card)
+        self._draw_for(player)
+
+    def _draw_for(self, player: Player):
+        if self._listeners and not len(self._deck) and self._deck.discards:
+            for listener in self._listeners:
+                listener.reshuffled()
         player.draw_card(self.draw_card)
+        for listener in self._listeners:
+            listener.card_drawn(player, player.hand[-1])
+
+    def legal_moves(self, player: Player) -> HandMoves:
+        return self.board.hand_moves(player.hand, player)
+
+    def exchange_dead_cards(self, player: Player) -> List[Card]:
+        """Exchange every dead card in the player's hand once, replacements may be dead as well
+        """
+        dead = self.legal_moves(player).dead
+        for card in dead:
+            self.exchange_dead_card(player, card)
+        return dead
 
     def _find_sequences(self):
         sequences = collections.defaultdict(list)
@@ -83,8 +176,9 @@ class Game:
                 sequences[player].append(sequence)
         return sequences
 
-    def _deal_initial_hands(self):
-        card_count = {
+    @staticmethod
+    def hand_size_for(player_count: int) -> int:
+        return {
             2: 7,
             3: 6,
             4: 6,
@@ -93,26 +187,22 @@ class Game:
             9: 4,
             10: 3,
             12: 3,
-        }[len(self.players)]
+        }[player_count]
+
+    def _deal_initial_hands(self):
+        card_count = Game.hand_size_for(len(self.players))
         for i in range(card_count):
             for player in self.players:
                 player.draw_card(self.draw_card)
 
     def draw_card(self) -> Card:
-        try:
-            return self._deck.pop()
-        except IndexError:
-            random.shuffle(self._discard_pile)
-            self._deck = list(self._discard_pile)
-            self._discard_pile = []
-            return self.draw_card()
+        return self._deck.draw()
 
     @staticmethod
-    def new_deck() -> List['Card']:
+    def new_deck(rng: random.Random) -> Deck:
         single = generate_deck()
         doubled = single * 2
-        random.shuffle(doubled)
-        return doubled
+        return Deck.shuffled(doubled, rng)
 
     def get_state_perspective(self, player: Player, current_player_turn: Player):
         return PublicGameState(
@@ -121,5 +211,6 @@ class Game:
             ],
             player=player,
             board=self.board,
-            current_player_turn=current_player_turn
+            current_player_turn=current_player_turn,
+            board_hash=self.board.zobrist,
         )
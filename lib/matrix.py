@@ -1,8 +1,10 @@
-import itertools
-from typing import Tuple, Iterator, Callable, List, Sequence, Set
+import collections
+import functools
+from typing import Tuple, Iterator, Callable, List, Sequence, Dict, Iterable
 
 
 Coordinate = Tuple[int, int]
+Line = Tuple[Coordinate, ...]
 SubCell = Tuple[Coordinate, 'Cell']
 CSequence = Sequence[SubCell]  # 'Cell' Sequence
 MultiSequence = Iterator[CSequence]
@@ -10,66 +12,102 @@ Matrix = List[List['Cell']]
 CellCondition = Callable[['Cell'], bool]
 
 
-def get_valid_sequences(board: Matrix, sequence_length: int, cell_condition: CellCondition, win_count: int):
-    seqs = set(_find_sequences_meeting_condition(board, sequence_length, cell_condition))
-    distinct = _distinct_sequences(seqs, win_count)
-    return distinct
-
-
-def _find_sequences_meeting_condition(grid, sequence_length: int, cell_condition: CellCondition) -> MultiSequence:
-    for sequence in _all_submatrices(grid, sequence_length):
-        if all(cell_condition(cell[1]) for cell in sequence):
-            yield sequence
-
+class LineTable:
+    """Every distinct line of `sequence_length` cells in a rows x columns grid.
+    Lines are tuples of coordinates, (0,0) is top left.
+    Build through `line_table` so that each geometry is only computed once.
+    """
 
-def _distinct_sequences(sequences: Set[CSequence], required: int):
-    max_group_size = min(len(sequences), required)
-    for group_size in reversed(range(max_group_size+1)):
-        for group in itertools.combinations(sequences, group_size):
-            if _check_distinct(group):  # noqa
-                return group
+    def __init__(self, rows: int, columns: int, sequence_length: int):
+        self.rows = rows
+        self.columns = columns
+        self.sequence_length = sequence_length
+        self.lines: Tuple[Line, ...] = tuple(_generate_lines(rows, columns, sequence_length))
+        by_coordinate = {(r, c): [] for r in range(rows) for c in range(columns)}
+        for line in self.lines:
+            for coord in line:
+                by_coordinate[coord].append(line)
+        self.by_coordinate: Dict[Coordinate, Tuple[Line, ...]] = {
+            coord: tuple(lines) for coord, lines in by_coordinate.items()
+        }
+        index = {line: i for i, line in enumerate(self.lines)}
+        self.ids_by_coordinate: Dict[Coordinate, Tuple[int, ...]] = {
+            coord: tuple(index[line] for line in lines) for coord, lines in self.by_coordinate.items()
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def line_table(rows: int, columns: int, sequence_length: int) -> LineTable:
+    return LineTable(rows, columns, sequence_length)
 
 
-def _all_submatrices(matrix: Matrix, sequence_length: int) -> MultiSequence:
-    for start_row in range(len(matrix) + 1 - sequence_length):
-        for start_column in range(len(matrix[0]) + 1 - sequence_length):
-            yield from _iterate_submatrix(matrix, start_row, start_column, sequence_length)
+def get_valid_sequences(board: Matrix, sequence_length: int, cell_condition: CellCondition, win_count: int):
+    lines = list(_find_sequences_meeting_condition(board, sequence_length, cell_condition))
+    distinct = _distinct_sequences(lines, win_count)
+    return tuple(with_cells(board, line) for line in distinct)
 
 
-def _iterate_submatrix(matrix: Matrix, start_row: int, start_column: int, N: int) -> MultiSequence:
-    """Yield the horizontals and diagonals of NxN subsection of matrix starting at start_row, start_column as N-tuples.
-    (0,0) is top left
-    Return type is a 2-tuple of (coordinate, cell) giving the absolute position of the cell in the greater matrix
-    :return generator of `SubCell` sequences
+def with_cells(board: Matrix, line: Line) -> CSequence:
+    """Pair each coordinate of line with its cell, the shape callers of `get_valid_sequences` receive
     """
-    submatrix = [row[start_column:start_column + N] for row in matrix[start_row:start_row + N]]
-    # yield rows
-    for r, row in enumerate(submatrix):
-        yield tuple(((start_row + r, start_column + c), cell) for c, cell in enumerate(row))
-    # yield columns
-    for column_index in range(0, N):
-        yield tuple((((start_row + r, start_column + column_index), row[column_index])
-                     for r, row in enumerate(submatrix)))
-    # yield diagonal down-to-right
-    yield tuple(((start_row + diag, start_column + diag), submatrix[diag][diag]) for diag in range(0, N))
-    # yield diagonal up-to-right
-    yield tuple(((start_row + diag_rev, start_column + (N - 1 - diag_rev)), submatrix[diag_rev][N - 1 - diag_rev])
-                for diag_rev in range(0, N))
+    return tuple(((r, c), board[r][c]) for r, c in line)
 
 
-def _coords_from_sequence(sequence: CSequence) -> Set[Coordinate]:
-    return set(coord for (coord, _) in sequence)
+def _find_sequences_meeting_condition(grid, sequence_length: int, cell_condition: CellCondition) -> Iterator[Line]:
+    for line in line_table(len(grid), len(grid[0]), sequence_length).lines:
+        if all(cell_condition(grid[r][c]) for r, c in line):
+            yield line
 
 
-def _check_pair_distinct(first, second) -> bool:
-    return len(_coords_from_sequence(first).intersection(_coords_from_sequence(second))) <= 1
-
-
-def _check_distinct(sequence_group: List[CSequence]) -> bool:
-    for pair in itertools.combinations(sequence_group, 2):
-        if not _check_pair_distinct(pair[0], pair[1]):
-            return False
-    return True
+def _distinct_sequences(sequences: Iterable[Line], required: int):
+    """Select up to `required` lines of which no two share more than one cell.
 
+    Lines in different directions, or on different parallel tracks, can share at most one cell, so lines
+    only conflict with the other lines on the same track. On a track, two lines of length N share
+    N - offset cells, which leaves a one-dimensional choice: take the earliest line, then every line
+    starting at least N - 1 cells after the last one taken. This maximizes the count on each track, and
+    the track maxima add up to the overall maximum.
+    """
+    if required <= 0:
+        return ()
+    tracks = collections.defaultdict(list)
+    for line in set(sequences):
+        direction, track, position = _line_position(line)
+        tracks[(direction, track)].append((position, line))
+    selected = []
+    for key in sorted(tracks):
+        last = None
+        for position, line in sorted(tracks[key]):
+            if last is None or position - last >= len(line) - 1:
+                selected.append(line)
+                last = position
+                if len(selected) == required:
+                    return tuple(selected)
+    return tuple(selected)
+
+
+def _line_position(line: Line) -> Tuple[Coordinate, int, int]:
+    """Return the direction of a straight line, which parallel track it lies on, and where along the track it starts
+    """
+    (r, c), (next_r, next_c) = line[0], line[1]
+    dr, dc = next_r - r, next_c - c
+    track = r * dc - c * dr
+    position = c * dc if dc else r * dr
+    return (dr, dc), track, position
 
 
+def _generate_lines(rows: int, columns: int, N: int) -> Iterator[Line]:
+    """Yield each horizontal, vertical and diagonal run of N cells exactly once
+    """
+    for r in range(rows):
+        for c in range(columns + 1 - N):
+            yield tuple((r, c + i) for i in range(N))
+    for r in range(rows + 1 - N):
+        for c in range(columns):
+            yield tuple((r + i, c) for i in range(N))
+    for r in range(rows + 1 - N):
+        for c in range(columns + 1 - N):
+            # diagonal down-to-right
+            yield tuple((r + i, c + i) for i in range(N))
+            # diagonal up-to-right
+            yield tuple((r + i, c + (N - 1 - i)) for i in range(N))
@@ -1,9 +1,13 @@
+import array
 import collections
 import enum
-from dataclasses import field, dataclass
-from typing import List, Union, Optional, Dict, Tuple
+import functools
+import itertools
+import random
+from dataclasses import dataclass
+from typing import List, Union, Optional, Dict, Tuple, Set, ClassVar
 
-from lib import matrix
+from lib import matrix, threats, zobrist
 
 
 class InvalidCellSelection(Exception):
@@ -52,16 +56,43 @@ class Rank(enum.Enum):
         return str(self)[0]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Card:
+    """Cards are interned: Card(suit, rank) always returns the same instance, which carries a compact `id`
+    in range(52) and a precomputed hash.
+    """
+    __slots__ = ('suit', 'rank', 'id', '_hash')
     suit: Suit
     rank: Rank
 
-    def __post_init__(self):
-        if not isinstance(self.rank, Rank):
-            raise TypeError(f"Card.rank must be Rank, got {self.rank.__class__}")
-        if not isinstance(self.suit, Suit):
-            raise TypeError(f"Card.suit must be Suit, got {self.suit.__class__}")
+    _interned: ClassVar[Dict[Tuple['Suit', 'Rank'], 'Card']] = {}
+
+    def __new__(cls, suit, rank):
+        card = cls._interned.get((suit, rank))
+        if card is None:
+            if not isinstance(rank, Rank):
+                raise TypeError(f"Card.rank must be Rank, got {rank.__class__}")
+            if not isinstance(suit, Suit):
+                raise TypeError(f"Card.suit must be Suit, got {suit.__class__}")
+            card = super(Card, cls).__new__(cls)
+            object.__setattr__(card, 'id', (suit.value - 1) * len(Rank) + rank.value - 1)
+            object.__setattr__(card, '_hash', hash(card.id))
+            cls._interned[(suit, rank)] = card
+        return card
+
+    def __reduce__(self):
+        return Card, (self.suit, self.rank)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, Card):
+            return self.id == other.id
+        return NotImplemented
+
+    @classmethod
+    def from_id(cls, card_id: int) -> 'Card':
+        return DECK[card_id]
 
     @property
     def is_one_eyed_jack(self):
@@ -75,7 +106,7 @@ class Card:
         return f"{self.rank} of {self.suit}"
 
     def __hash__(self):
-        return hash((self.suit.value, self.rank))
+        return self._hash
 
     @property
     def red(self):
@@ -96,11 +127,17 @@ class Color(enum.Enum):
     GREEN = 'green'
 
 
-@dataclass
+@dataclass(init=False)
 class Player:
+    __slots__ = ('id', 'name', 'hand')
     id: str
     name: str
-    hand: List['Card'] = field(default_factory=list)
+    hand: List['Card']
+
+    def __init__(self, id: str, name: str, hand: Optional[List['Card']] = None):
+        self.id = id
+        self.name = name
+        self.hand = [] if hand is None else hand
 
     def __hash__(self):
         return hash(self.id)
@@ -130,6 +167,9 @@ class WildCard:
     suit = None
     rank = None
 
+    def __reduce__(self):
+        return "Wild"  # unpickles as the module's single instance, which `Cell.is_wild` compares against
+
     @property
     def debug(self):
         return "W"
@@ -148,6 +188,7 @@ Wild = WildCard()
 
 @dataclass
 class Cell:
+    __slots__ = ('card', 'player')
     card: Union[Card, type(Wild)]
     player: Optional[Player]
 
@@ -177,18 +218,95 @@ class Cell:
         return self.card is Wild
 
 
+DECK: Tuple[Card, ...] = tuple(
+    Card(s, r)
+    for s in Suit
+    for r in Rank
+)
+
+
 def generate_deck():
-    return [
-        Card(s, r)
-        for s in Suit
-        for r in Rank
-    ]
+    return list(DECK)
+
+
+class Deck:
+    """Draw pile and discard pile stored as arrays of `Card.id`.
+
+    Cards are drawn from a read cursor; once the draw pile runs out the discard pile is shuffled in place
+    with the deck's own `random.Random` and becomes the new draw pile.
+    """
+
+    def __init__(self, card_ids, rng: random.Random):
+        self._rng = rng
+        self._cards = array.array('B', card_ids)
+        self._cursor = 0
+        self._discards = array.array('B')
+
+    @classmethod
+    def shuffled(cls, cards: List['Card'], rng: random.Random) -> 'Deck':
+        deck = cls([card.id for card in cards], rng)
+        rng.shuffle(deck._cards)
+        return deck
+
+    def __len__(self):
+        return len(self._cards) - self._cursor
+
+    def draw(self) -> 'Card':
+        if self._cursor == len(self._cards):
+            if not self._discards:
+                raise IndexError("Draw and discard piles are both empty")
+            self._cards, self._discards = self._discards, array.array('B')
+            self._cursor = 0
+            self._rng.shuffle(self._cards)
+        card_id = self._cards[self._cursor]
+        self._cursor += 1
+        return DECK[card_id]
+
+    def discard(self, card: 'Card'):
+        self._discards.append(card.id)
+
+    @property
+    def remaining(self) -> List['Card']:
+        return [DECK[card_id] for card_id in self._cards[self._cursor:]]
+
+    @property
+    def discards(self) -> List['Card']:
+        return [DECK[card_id] for card_id in self._discards]
+
+    def copy(self, rng: random.Random) -> 'Deck':
+        deck = Deck.__new__(Deck)
+        deck._rng = rng
+        deck._cards = array.array('B', self._cards)
+        deck._cursor = self._cursor
+        deck._discards = array.array('B', self._discards)
+        return deck
 
 
 class DeadCardError(Exception):
     pass
 
 
+@dataclass(frozen=True)
+class Move:
+    player: 'Player'
+    card: 'Card'
+    row: int
+    column: int
+
+
+@dataclass
+class HandMoves:
+    """Every legal move for a hand: the cells each playable card can claim, and the dead cards
+    """
+    moves: Dict['Card', List[Tuple[int, int]]]
+    dead: List['Card']
+
+    def pairs(self):
+        for card, cells in self.moves.items():
+            for cell in cells:
+                yield card, cell
+
+
 class Board:
     __DIM = 10
     ROWS = __DIM
@@ -197,10 +315,25 @@ class Board:
 
     def __init__(self, cells):
         self.cells: List[List[Cell]] = cells
-        self._cells_by_card: Dict['Card', List[Tuple[int, int]]] = Board._hashmap(self.cells)
-
-    @staticmethod
-    def claim_cell(player, card: 'Card', cell: 'Cell'):
+        self._cells_by_card: Dict['Card', Tuple[Tuple[int, int], ...]] = Board._hashmap(
+            tuple(tuple(cell.card for cell in row) for row in self.cells)
+        )
+        self._line_table = matrix.line_table(self.ROWS, self.COLUMNS, self.SEQUENCE_LENGTH)
+        self._lines_by_cell = self._line_table.by_coordinate
+        self._sequences: Dict['Player', Set[matrix.Line]] = collections.defaultdict(set)
+        self._selected: Dict[Tuple['Player', int], tuple] = {}
+        self._open: Set[matrix.Coordinate] = set()
+        self._occupied_by: Dict['Player', Set[matrix.Coordinate]] = collections.defaultdict(set)
+        self._open_by_card: Dict['Card', int] = collections.Counter()
+        self._history: List[Tuple[Move, Optional['Player']]] = []
+        self.zobrist: int = 0
+        self._rebuild_moves()
+        self._rebuild_lines()
+        self._rebuild_sequences()
+
+    def claim_cell(self, player, card: 'Card', row: int, column: int):
+        cell = self.get_cell(row, column)
+        previous = cell.player
         if cell.is_wild:
             raise ValueError("Wild space cannot be played!")
         if cell.is_occupied:
@@ -208,16 +341,67 @@ class Board:
                 raise ValueError("Player cannot play on a cell they already possess")
             if card.is_one_eyed_jack:
                 cell.player = None
+                self._cell_changed((row, column), previous, None)
                 return True
-        if card.is_two_eyed_jack:
-            cell.player = player
-            return True
-        if cell.can_play_card(card):
+        if card.is_two_eyed_jack or cell.can_play_card(card):
             cell.player = player
+            self._cell_changed((row, column), previous, player)
             return True
         else:
             raise RuntimeError("Cell does not match card.")
 
+    def apply(self, move: Move):
+        """Claim a cell like `claim_cell`, remembering the previous owner so that `undo` can revert it
+        """
+        previous = self.get_cell(move.row, move.column).player
+        result = self.claim_cell(move.player, move.card, move.row, move.column)
+        self._history.append((move, previous))
+        return result
+
+    def undo(self) -> Move:
+        """Revert the most recent `apply`
+        """
+        move, previous = self._history.pop()
+        cell = self.cells[move.row][move.column]
+        current = cell.player
+        cell.player = previous
+        self._cell_changed((move.row, move.column), current, previous)
+        return move
+
+    def clone(self) -> 'Board':
+        """Copy of the board that shares the static layout and line tables, but not the occupancy
+        """
+        board = self.__class__.__new__(self.__class__)  # copy.copy would go through __getstate__ and rebuild
+        board.__dict__.update(self.__dict__)
+        board.cells = [[Cell(cell.card, cell.player) for cell in row] for row in self.cells]
+        board._sequences = collections.defaultdict(set, {p: set(lines) for p, lines in self._sequences.items()})
+        board._selected = {}
+        board._open = set(self._open)
+        board._occupied_by = collections.defaultdict(set, {p: set(cells) for p, cells in self._occupied_by.items()})
+        board._open_by_card = collections.Counter(self._open_by_card)
+        board._history = list(self._history)
+        board._line_counters = self._line_counters.copy()
+        return board
+
+    def __getstate__(self):
+        """Pickle only who owns each cell, and the layout when it is not the standard one. The line tables,
+        counters and move indexes are derived from those and rebuilt on load.
+        """
+        layout = tuple(tuple(cell.card for cell in row) for row in self.cells)
+        return {
+            "owners": [[cell.player for cell in row] for row in self.cells],
+            "layout": None if layout == self._layout() else layout,
+            "history": self._history,
+        }
+
+    def __setstate__(self, state):
+        layout = state["layout"] or self._layout()
+        self.__init__([
+            [Cell(card, player) for card, player in zip(cards, owners)]
+            for cards, owners in zip(layout, state["owners"])
+        ])
+        self._history = state["history"]
+
     def get_cell(self, row, column):
         if row >= self.ROWS:
             raise InvalidCellSelection(f"Row must be between 0 and {self.ROWS}")
@@ -227,6 +411,13 @@ class Board:
 
     @classmethod
     def new_board(cls):
+        return cls(cells=[[Cell(card, player=None) for card in row] for row in cls._layout()])
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _layout() -> Tuple[Tuple[Union[Card, type(Wild)], ...], ...]:
+        """The static card layout shared by every board
+        """
         S = Suit.SPADES
         C = Suit.CLUBS
         D = Suit.DIAMONDS
@@ -260,51 +451,174 @@ class Board:
             [T, T, Q, K, A, 2, 3, 4, 5, 6],
             [N, 9,  8, 7, 6, 5, 4, 3, 2, N],
         ]
-        cells = []
-        for r in range(cls.ROWS):
-            row = []
-            for c in range(cls.COLUMNS):
-                row.append(Cell.from_values(rank=ranks[r][c], suit=suits[r][c]))
-            cells.append(row)
-        return cls(cells=cells)
+        return tuple(
+            tuple(Cell.from_values(rank=ranks[r][c], suit=suits[r][c]).card for c in range(len(ranks[r])))
+            for r in range(len(ranks))
+        )
 
     def find_sequences_for_player(self, player: Player, win_count: int):
-        def condition(cell: Cell):
-            return cell.player == player or cell.is_wild
-        yield from matrix.get_valid_sequences(self.cells, self.SEQUENCE_LENGTH, condition, win_count)
+        key = (player, win_count)
+        if key not in self._selected:
+            lines = matrix._distinct_sequences(self._sequences.get(player, ()), win_count)
+            self._selected[key] = tuple(matrix.with_cells(self.cells, line) for line in lines)
+        yield from self._selected[key]
+
+    def _line_complete(self, line: 'matrix.Line', player: 'Player'):
+        for r, c in line:
+            cell = self.cells[r][c]
+            if not (cell.player == player or cell.is_wild):
+                return False
+        return True
+
+    def _cell_changed(self, coordinate: 'matrix.Coordinate', previous: Optional['Player'],
+                      current: Optional['Player']):
+        """Called after the owner of the cell at `coordinate` changed from `previous` to `current`
+        """
+        if previous is not None:
+            self.zobrist ^= zobrist.key(coordinate, previous.id)
+        if current is not None:
+            self.zobrist ^= zobrist.key(coordinate, current.id)
+        self._update_moves(coordinate, previous, current)
+        self._line_counters.update(coordinate, previous, current)
+        self._update_sequences(coordinate, previous, current)
+
+    def _update_moves(self, coordinate: 'matrix.Coordinate', previous: Optional['Player'],
+                      current: Optional['Player']):
+        card = self.cells[coordinate[0]][coordinate[1]].card
+        if previous is None:
+            self._open.discard(coordinate)
+            self._open_by_card[card] -= 1
+        else:
+            self._occupied_by[previous].discard(coordinate)
+        if current is None:
+            self._open.add(coordinate)
+            self._open_by_card[card] += 1
+        else:
+            self._occupied_by[current].add(coordinate)
+
+    def _rebuild_moves(self):
+        self._open.clear()
+        self._occupied_by.clear()
+        self._open_by_card.clear()
+        self.zobrist = 0
+        for r, row in enumerate(self.cells):
+            for c, cell in enumerate(row):
+                if cell.is_occupied:
+                    self._occupied_by[cell.player].add((r, c))
+                    self.zobrist ^= zobrist.key((r, c), cell.player.id)
+                elif not cell.is_wild:
+                    self._open.add((r, c))
+                    self._open_by_card[cell.card] += 1
+
+    def _rebuild_lines(self):
+        wild = {(r, c) for r, row in enumerate(self.cells) for c, cell in enumerate(row) if cell.is_wild}
+        self._line_counters = threats.LineCounters(self._line_table, wild)
+        for r, row in enumerate(self.cells):
+            for c, cell in enumerate(row):
+                if cell.is_occupied:
+                    self._line_counters.update((r, c), None, cell.player)
+
+    def _update_sequences(self, coordinate: 'matrix.Coordinate', previous: Optional['Player'],
+                          current: Optional['Player']):
+        """Re-check only the lines passing through `coordinate` after its owner changed from `previous` to `current`
+        """
+        if previous is not None and previous in self._sequences:
+            self._sequences[previous].difference_update(self._lines_by_cell[coordinate])
+            self._invalidate_selected(previous)
+        if current is not None:
+            for line in self._lines_by_cell[coordinate]:
+                if self._line_complete(line, current):
+                    self._sequences[current].add(line)
+            self._invalidate_selected(current)
+
+    def _invalidate_selected(self, player: 'Player'):
+        for key in [k for k in self._selected if k[0] == player]:
+            del self._selected[key]
+
+    def _rebuild_sequences(self):
+        self._sequences.clear()
+        self._selected.clear()
+        for r, row in enumerate(self.cells):
+            for c, cell in enumerate(row):
+                if cell.is_occupied:
+                    self._update_sequences((r, c), None, cell.player)
+
+    def lines_needing(self, player: 'Player', k: int) -> List['matrix.Line']:
+        """Lines no opponent has entered where `player` needs exactly `k` more cells for a sequence
+        """
+        lines = self._line_table.lines
+        return [lines[i] for i in sorted(self._line_counters.lines_needing(player, k))]
+
+    def count_lines_needing(self, player: 'Player', k: int) -> int:
+        """len(lines_needing(player, k)) without building the lines
+        """
+        return len(self._line_counters.lines_needing(player, k))
+
+    def completing_cells(self, player: 'Player') -> Set['matrix.Coordinate']:
+        """Open cells that would complete a sequence for `player`
+        """
+        return self.cells_needing(player, 1)
+
+    def cells_needing(self, player: 'Player', k: int) -> Set['matrix.Coordinate']:
+        """Open cells on the lines returned by `lines_needing`
+        """
+        cells = set()
+        for line in self.lines_needing(player, k):
+            cells.update(coord for coord in line if coord in self._open)
+        return cells
+
+    def blocking_cells(self, player: 'Player') -> Set['matrix.Coordinate']:
+        """Open cells that would complete a sequence for an opponent of `player`
+        """
+        cells = set()
+        for opponent, occupied in self._occupied_by.items():
+            if opponent != player and occupied:
+                cells |= self.completing_cells(opponent)
+        return cells
 
     def find_valid_cells(self, card: 'Card', player: 'Player'):
+        if self.is_dead_card(card, player):
+            raise DeadCardError(f"No valid moves found for {card}")
         if card.is_one_eyed_jack:
-            moves = self._all_occupied(player)
+            return self._all_occupied(player)
         elif card.rank == Rank.JACK:  # TWO EYED JACK WILD
-            moves = self._all_unoccupied()
+            return self._all_unoccupied()
         else:
-            moves: List[Tuple[int, int]] = self._cells_by_card[card]
-            moves = [m for m in moves if not self.cells[m[0]][m[1]].is_occupied]
-        if moves is not None and not moves:
-            raise DeadCardError(f"No valid moves found for {card}")
-        return moves
+            return [m for m in self._cells_by_card.get(card, ()) if m in self._open]
+
+    def hand_moves(self, hand: List['Card'], player: 'Player') -> HandMoves:
+        moves = {}
+        dead = []
+        for card in hand:
+            if card not in moves:
+                moves[card] = [] if self.is_dead_card(card, player) else self.find_valid_cells(card, player)
+            if not moves[card]:
+                dead.append(card)
+        return HandMoves(moves={card: cells for card, cells in moves.items() if cells}, dead=dead)
+
+    def is_dead_card(self, card: 'Card', player: 'Player') -> bool:
+        if card.is_one_eyed_jack:
+            return not any(cells for owner, cells in self._occupied_by.items() if owner != player)
+        elif card.rank == Rank.JACK:
+            return not self._open
+        else:
+            return not self._open_by_card[card]
 
     @staticmethod
-    def _hashmap(cells) -> Dict['Card', List[Tuple[int, int]]]:
+    @functools.lru_cache(maxsize=None)
+    def _hashmap(layout) -> Dict['Card', Tuple[Tuple[int, int], ...]]:
+        """Index a card layout by card, cached so that boards sharing a layout share the index
+        """
         cell_map = collections.defaultdict(list)
-        for r, row in enumerate(cells):
-            for c, cell in enumerate(row):
-                cell_map[cell.card].append((r, c))
-        return cell_map
+        for r, row in enumerate(layout):
+            for c, card in enumerate(row):
+                cell_map[card].append((r, c))
+        return {card: tuple(coordinates) for card, coordinates in cell_map.items()}
 
     def _all_occupied(self, player: 'Player'):
-        moves = []
-        for r, row in enumerate(self.cells):
-            for c, cell in enumerate(row):
-                if cell.is_occupied and not cell.player == player:
-                    moves.append((r, c))
-        return moves
+        return sorted(itertools.chain.from_iterable(
+            cells for owner, cells in self._occupied_by.items() if owner != player
+        ))
 
     def _all_unoccupied(self):
-        moves = []
-        for r, row in enumerate(self.cells):
-            for c, cell in enumerate(row):
-                if not cell.is_occupied and not cell.is_wild:
-                    moves.append((r, c))
-        return moves
\ No newline at end of file
+        return sorted(self._open)
@@ -0,0 +1,86 @@
+"""Per-line ownership counters for evaluating threats without rescanning the board.
+
+For every line of the board's `matrix.LineTable` the counters hold how many cells each player owns and how
+many are occupied at all. Lines a player could still complete (no opponent on them) are bucketed by how many
+more cells the player needs, so "lines where X needs k more cells" is a dictionary lookup.
+"""
+from typing import Dict, Hashable, List, Optional, Set
+
+from lib import matrix
+
+BLOCKED = -1
+
+
+class LineCounters:
+    def __init__(self, table: 'matrix.LineTable', wild: Set['matrix.Coordinate']):
+        self.table = table
+        self._wild: List[int] = [sum(coord in wild for coord in line) for line in table.lines]
+        self._occupied: List[int] = [0] * len(table.lines)
+        self._owned: Dict[Hashable, List[int]] = {}
+        # only maintained for players that have been asked about, see `_track`
+        self._need: Dict[Hashable, List[int]] = {}
+        self._buckets: Dict[Hashable, Dict[int, Set[int]]] = {}
+
+    def copy(self) -> 'LineCounters':
+        counters = LineCounters.__new__(LineCounters)
+        counters.table = self.table
+        counters._wild = self._wild
+        counters._occupied = list(self._occupied)
+        counters._owned = {player: list(owned) for player, owned in self._owned.items()}
+        counters._need = {player: list(need) for player, need in self._need.items()}
+        counters._buckets = {
+            player: {k: set(ids) for k, ids in buckets.items()} for player, buckets in self._buckets.items()
+        }
+        return counters
+
+    def update(self, coordinate: 'matrix.Coordinate', previous: Optional[Hashable], current: Optional[Hashable]):
+        line_ids = self.table.ids_by_coordinate[coordinate]
+        if previous is not None:
+            owned = self._owned[previous]
+            for i in line_ids:
+                owned[i] -= 1
+                self._occupied[i] -= 1
+        if current is not None:
+            owned = self._owned.setdefault(current, [0] * len(self.table.lines))
+            for i in line_ids:
+                owned[i] += 1
+                self._occupied[i] += 1
+        for player in self._need:
+            for i in line_ids:
+                self._rebucket(player, i)
+
+    def owned(self, player: Hashable, line_id: int) -> int:
+        owned = self._owned.get(player)
+        return owned[line_id] if owned else 0
+
+    def need(self, player: Hashable, line_id: int) -> int:
+        """Cells `player` still has to claim to complete the line, or BLOCKED when an opponent holds one of them
+        """
+        owned = self.owned(player, line_id)
+        if self._occupied[line_id] > owned:
+            return BLOCKED
+        return self.table.sequence_length - owned - self._wild[line_id]
+
+    def lines_needing(self, player: Hashable, k: int) -> Set[int]:
+        return self._track(player).get(k, set())
+
+    def _track(self, player: Hashable) -> Dict[int, Set[int]]:
+        buckets = self._buckets.get(player)
+        if buckets is None:
+            self._need[player] = [BLOCKED] * len(self.table.lines)
+            buckets = self._buckets[player] = {}
+            for i in range(len(self.table.lines)):
+                self._rebucket(player, i)
+        return buckets
+
+    def _rebucket(self, player: Hashable, line_id: int):
+        need = self._need[player]
+        old, new = need[line_id], self.need(player, line_id)
+        if old == new:
+            return
+        buckets = self._buckets[player]
+        if old != BLOCKED:
+            buckets[old].discard(line_id)
+        if new != BLOCKED:
+            buckets.setdefault(new, set()).add(line_id)
+        need[line_id] = new
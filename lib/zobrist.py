@@ -0,0 +1,68 @@
+"""Zobrist hashing for boards, and a bounded transposition cache keyed on the hashes.
+
+Keys are derived from the player id and coordinate rather than drawn from a random table, so the same
+position hashes to the same value in every process (the network host and its clients, simulation workers).
+"""
+import collections
+import hashlib
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+_keys: Dict[Tuple[str, int, int], int] = {}
+
+
+def key(coordinate: Tuple[int, int], player_id: str) -> int:
+    """64-bit key for `player_id` owning the cell at `coordinate`
+    """
+    k = (player_id, coordinate[0], coordinate[1])
+    value = _keys.get(k)
+    if value is None:
+        digest = hashlib.blake2b(repr(k).encode("utf-8"), digest_size=8).digest()
+        value = _keys[k] = int.from_bytes(digest, "big")
+    return value
+
+
+class TranspositionCache:
+    """Least-recently-used mapping of position hashes to evaluations, holding at most `maxsize` entries
+    """
+
+    def __init__(self, maxsize: int = 2 ** 16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Hashable, Any] = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, position: Hashable):
+        return position in self._entries
+
+    def get(self, position: Hashable, default=None):
+        try:
+            value = self._entries[position]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(position)
+        self.hits += 1
+        return value
+
+    def put(self, position: Hashable, value):
+        self._entries[position] = value
+        self._entries.move_to_end(position)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, position: Hashable, compute: Callable[[], Any]):
+        value = self.get(position, _missing)
+        if value is _missing:
+            value = compute()
+            self.put(position, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+_missing = object()
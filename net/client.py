@@ -64,10 +64,15 @@ class GameClient:
             self._interface.echo("Lobby was not yet open, please try again.")
 
     def _handle_player_turn(self):
-        card, move = self._console_game._handle_turn(self._console_game._game, self.player)
-        message = Request(Action.MOVE, (card, move), self._player_id)
-        reply = self._client.send(message)
-        return reply
+        # the host holds the deck and has already exchanged dead cards, the local game only offers the moves
+        while True:
+            turn = self._console_game._choose_turn(self._console_game._game, self.player)
+            if turn is None:
+                return None
+            reply = self._client.send(Request(Action.MOVE, turn, self._player_id))
+            if reply.status == Status.ack:
+                return reply
+            self._interface.echo("The host rejected that move, choose again")
 
     def poll(self):
         reply = self._client.send(Request(Action.POLL, "", self._player_id))
@@ -77,10 +82,21 @@ class GameClient:
                 if isinstance(new_state, ConsoleLobby):
                     self._lobby = new_state
                 elif isinstance(new_state, PublicGameState):
+                    if self._state_unchanged(new_state):
+                        self._state = new_state
+                        return
                     self.set_state(new_state)
                 if self._refresh is not None:
                     self.refresh_display(self._refresh)
 
+    def _state_unchanged(self, new_state: PublicGameState):
+        return (
+            self._state is not None
+            and self._console_game is not None
+            and new_state.board_hash == self._state.board_hash
+            and new_state.current_player_turn == self._state.current_player_turn
+        )
+
     def set_state(self, new_state: PublicGameState):
         if not self._console_game:
             self._console_game = ConsoleGame(use_console=self._interface._console)
@@ -15,6 +15,8 @@ from net.protocol import Status
 from net.utils import make_thread
 from net.zmq import HostServerZMQ
 
+EXCHANGE_ROUNDS = 10  # times a remote player's dead cards are exchanged while replacements keep coming up dead
+
 
 class NetworkedGameDispatch(ActionDispatch):
     def __init__(self, game: 'GameHost'):
@@ -139,16 +141,34 @@ class GameHost:
 
     def _wait_for_turn(self, player: Player):
         self._state = "WAIT_TURN"
-        self._current_player = player
-        if self._current_player == self._host_player:
+        if player == self._host_player:
+            self._current_player = player
             self._handle_host_turn()
-        else:
+        elif self._exchange_dead_cards(player):
+            self._current_player = player
             self._state = "PLAYING_TURN"
             self._player_moved.wait()
         self._player_moved.clear()
         self._current_player = None
         self._state = "PLAY"
 
+    def _exchange_dead_cards(self, player: Player) -> bool:
+        """Exchange a remote player's dead cards before handing them the turn, return whether they can move.
+        The host holds the deck, so all exchanges happen here, repeated while replacements are dead as well,
+        since the client never exchanges. A player left without a playable card passes without being asked,
+        as nothing would come back to end the wait.
+        """
+        for _ in range(EXCHANGE_ROUNDS):
+            dead = self.game.exchange_dead_cards(player)
+            if not dead:
+                break
+            for card in dead:
+                self.echo(f"Exchanging dead card for {player}: {card}")
+        if self.game.legal_moves(player).moves:
+            return True
+        self.echo(f"{player} has no playable cards and passes")
+        return False
+
     def update_lobby(self, player_name):
         player = self._console_game.add_player_to_lobby(player_name)
         self._interface.enqueue(self._console_game._lobby.render())
@@ -172,6 +192,7 @@ class GameHost:
         if self._current_player == player:
             try:
                 result = self.game.take_turn(row, column, card, player)
+                self._current_player = None  # polls from here on no longer offer the player the turn
                 self._player_moved.set()
                 return result
             except:
@@ -0,0 +1,270 @@
+"""Depth-limited alpha-beta search for the open-hand variant, where every player's hand is visible.
+
+Negamax over two sides, the searching player against the rest of the table (a paranoid search, exact for two
+players): a child's value is negated only when the side to move changes. Iterative deepening searches depth
+1, 2, ... until the time budget runs out and plays the best move of the deepest finished iteration.
+
+A `TranspositionCache` keyed on `Board.zobrist`, the seat to move, the hands and the searching seat keeps each
+position's searched depth, bound and best move, which is tried first on the next visit. Values depend on the
+searching seat, as the search is paranoid on its behalf, and win values are cached as distances from the
+position, so one cache can be shared by searches from any root and for any seat. The other moves are ordered
+by the board's threats: completing a sequence, blocking an opponent's, removing a chip from one with a one-eyed
+jack, then extending the lines closest to completion, with regular cards before jacks.
+
+The draw pile stays hidden even with open hands, so cards played during the search are not replaced and hands
+only shrink. That is exact up to the hand size, deeper than the search gets in practice.
+
+usage: python -m sim.alphabeta --games 10 --time 0.5 --opponent greedy
+"""
+import argparse
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from lib.model import Board, Card, Move, Player, Rank
+from lib.zobrist import TranspositionCache
+
+Choice = Tuple[Card, Tuple[int, int]]  # the card to play and the (row, column) to play it on
+
+WIN = 1_000_000  # a won position, less the plies it took so that faster wins score higher
+WON = WIN - 10_000  # values beyond this are wins or losses, cached as plies from the node rather than the root
+EXACT, LOWER, UPPER = 0, 1, 2  # how a cached value bounds the position's true value
+SEQUENCE_WEIGHT = 1000
+LINE_WEIGHTS = {1: 100, 2: 20, 3: 4, 4: 1}  # open lines by how many more cells they need
+CHECK_EVERY = 1024  # nodes between looks at the clock
+
+
+class _Timeout(Exception):
+    pass
+
+
+@dataclass
+class SearchResult:
+    move: Optional[Choice]
+    value: float  # from the searching player's side
+    depth: int  # deepest finished iteration
+    nodes: int
+    seconds: float
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+
+class AlphaBeta:
+    """Search of one position. The board is searched in place with `Board.apply` and `Board.undo` and is left
+    in an undefined state when the time runs out, so give it a clone. Hands are lists of cards by seat.
+    """
+
+    def __init__(self, board: Board, players: Sequence[Player], hands: List[List[Card]], win_count: int,
+                 seat: int, cache: Optional[TranspositionCache] = None):
+        self.board = board
+        self.players = list(players)
+        self.hands = hands
+        self.win_count = win_count
+        self.seat = seat
+        self.cache = cache if cache is not None else TranspositionCache()
+        self.nodes = 0
+        self._deadline = math.inf
+
+    def search(self, root_moves: Sequence[Choice], time_budget: Optional[float] = None,
+               max_depth: Optional[int] = None) -> SearchResult:
+        """Deepen until the time budget runs out, max_depth is finished or a forced result is found.
+
+        :param root_moves: the searching player's legal moves, after exchanging their dead cards
+        """
+        if time_budget is None and max_depth is None:
+            raise ValueError("Give the search a time budget or a maximum depth")
+        start = time.perf_counter()
+        self._deadline = start + time_budget if time_budget is not None else math.inf
+        moves = list(root_moves)
+        best: Optional[Choice] = moves[0] if moves else None
+        value, depth = 0.0, 0
+        if len(moves) > 1:
+            while max_depth is None or depth < max_depth:
+                try:
+                    value, move = self._root(moves, depth + 1)
+                except _Timeout:
+                    break
+                best, depth = move, depth + 1
+                moves.remove(move)
+                moves.insert(0, move)  # the next iteration starts from the best move so far
+                if abs(value) >= WIN - depth:
+                    break  # forced win or loss, deeper iterations only find it again
+        return SearchResult(best, value, depth, self.nodes, time.perf_counter() - start)
+
+    def _root(self, moves: List[Choice], depth: int) -> Tuple[float, Choice]:
+        alpha, beta = -math.inf, math.inf
+        best = moves[0]
+        for card, cell in moves:
+            value = self._after(self.seat, card, cell, depth, alpha, beta, 0)
+            if value > alpha:
+                alpha, best = value, (card, cell)
+        return alpha, best
+
+    def _after(self, seat: int, card: Card, cell: Tuple[int, int], depth: int, alpha: float, beta: float,
+               ply: int) -> float:
+        """Value of playing card on cell for the side of seat"""
+        hand = self.hands[seat]
+        hand.remove(card)
+        self.board.apply(Move(self.players[seat], card, cell[0], cell[1]))
+        if self._sequences(seat) >= self.win_count:
+            value = WIN - ply
+        else:
+            value = self._child(seat, depth, alpha, beta, ply)
+        self.board.undo()
+        hand.append(card)
+        return value
+
+    def _child(self, seat: int, depth: int, alpha: float, beta: float, ply: int) -> float:
+        following = (seat + 1) % len(self.players)
+        if (following == self.seat) == (seat == self.seat):
+            return self._negamax(following, depth - 1, alpha, beta, ply + 1)
+        return -self._negamax(following, depth - 1, -beta, -alpha, ply + 1)
+
+    def _negamax(self, seat: int, depth: int, alpha: float, beta: float, ply: int) -> float:
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and time.perf_counter() > self._deadline:
+            raise _Timeout
+        if depth <= 0:
+            return self._evaluate(seat)
+        key = (
+            self.board.zobrist, seat, tuple(tuple(sorted(card.id for card in hand)) for hand in self.hands), self.seat
+        )
+        entry = self.cache.get(key)
+        cached_move = None
+        if entry is not None:
+            cached_depth, value, bound, cached_move = entry
+            value = _from_cache(value, ply)
+            if cached_depth >= depth and (
+                bound == EXACT or bound == LOWER and value >= beta or bound == UPPER and value <= alpha
+            ):
+                return value
+        moves = self._ordered_moves(seat, cached_move)
+        if not moves:
+            return self._child(seat, depth, alpha, beta, ply)  # nothing playable, the turn passes
+        original_alpha = alpha
+        best, best_move = -math.inf, None
+        for card, cell in moves:
+            value = self._after(seat, card, cell, depth, alpha, beta, ply)
+            if value > best:
+                best, best_move = value, (card, cell)
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+        bound = UPPER if best <= original_alpha else LOWER if best >= beta else EXACT
+        self.cache.put(key, (depth, _to_cache(best, ply), bound, best_move))
+        return best
+
+    def _ordered_moves(self, seat: int, first: Optional[Choice]) -> List[Choice]:
+        board = self.board
+        player = self.players[seat]
+        moves = list(board.hand_moves(self.hands[seat], player).pairs())
+        if len(moves) < 2:
+            return moves
+        completing = board.completing_cells(player)
+        blocking = board.blocking_cells(player)
+        extending = board.cells_needing(player, 2)
+        breaking = self._threatening_chips(player) if any(card.is_one_eyed_jack for card, _ in moves) else set()
+
+        def rank(move: Choice) -> int:
+            card, cell = move
+            if move == first:
+                return -1
+            if card.is_one_eyed_jack:
+                tier = 2 if cell in breaking else 8
+            elif cell in completing:
+                tier = 0
+            elif cell in blocking:
+                tier = 1
+            elif cell in extending:
+                tier = 3
+            else:
+                tier = 4
+            return 2 * tier + (card.rank == Rank.JACK)
+
+        moves.sort(key=rank)
+        return moves
+
+    def _threatening_chips(self, player: Player) -> Set[Tuple[int, int]]:
+        """Opponent chips on lines that opponent is one cell from completing"""
+        board = self.board
+        chips = set()
+        for opponent in self.players:
+            if opponent is not player:
+                for line in board.lines_needing(opponent, 1):
+                    chips.update((r, c) for r, c in line if board.cells[r][c].player == opponent)
+        return chips
+
+    def _sequences(self, seat: int) -> int:
+        return sum(1 for _ in self.board.find_sequences_for_player(self.players[seat], self.win_count))
+
+    def _score(self, seat: int) -> float:
+        board = self.board
+        player = self.players[seat]
+        score = SEQUENCE_WEIGHT * self._sequences(seat)
+        for k, weight in LINE_WEIGHTS.items():
+            score += weight * board.count_lines_needing(player, k)
+        return score
+
+    def _evaluate(self, seat: int) -> float:
+        """Heuristic value for the side of seat: the searching player's threats less their opponents'"""
+        value = sum(
+            self._score(other) if other == self.seat else -self._score(other) for other in range(len(self.players))
+        )
+        return value if seat == self.seat else -value
+
+
+def _to_cache(value: float, ply: int) -> float:
+    """Count a win or loss from the node at ply instead of the root"""
+    if value > WON:
+        return value + ply
+    if value < -WON:
+        return value - ply
+    return value
+
+
+def _from_cache(value: float, ply: int) -> float:
+    if value > WON:
+        return value - ply
+    if value < -WON:
+        return value + ply
+    return value
+
+
+def main(argv: Optional[List[str]] = None):
+    from sim.cpu import CPUSim
+    from sim.experiment import STRATEGIES
+    from sim.strategy import AlphaBetaStrategy, StrategyProvider
+
+    parser = argparse.ArgumentParser(description="Play alpha-beta against another strategy with open hands")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--time", type=float, default=0.5, help="seconds per move")
+    parser.add_argument("--max-depth", type=int)
+    parser.add_argument("--opponent", choices=sorted(STRATEGIES), default="greedy")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    searcher = AlphaBetaStrategy(random.Random(args.seed), time_budget=args.time, max_depth=args.max_depth)
+    wins = 0
+    for game in range(args.games):
+        names = CPUSim.CPU_NAMES[:2] if game % 2 == 0 else CPUSim.CPU_NAMES[1::-1]  # alternate who starts
+        with STRATEGIES[args.opponent](random.Random(f"{args.seed}:{game}")) as opponent:
+            strategies: Dict[str, object] = {names[0]: searcher, names[1]: opponent}
+            sim = CPUSim(2, StrategyProvider(strategies.__getitem__), seed=args.seed + game)
+            sim.run()
+        winner = sim.game.winner()
+        won = winner is not None and winner[0].name == names[0]
+        wins += won
+        print(f"game {game}: {'won' if won else 'lost'} in {sim.game.turn_count} turns")
+    report = searcher.report()
+    print(
+        f"won {wins}/{args.games} against {args.opponent}, {report['nodes_per_second']:.0f} nodes/s, "
+        f"depth {report['mean_depth']:.1f} on average, {report['max_depth']} at most over {report['moves']} searches"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Lockstep simulation of many games for batched policies.
+
+`LockstepSim` advances K independent `Game`s one turn at a time. Every step it exchanges each current player's
+dead cards and gathers all their observations into one `ObservationBatch`. A single call to the policy then
+picks a move for every game in the batch, and the moves are played back into their games. A vectorized model
+is called once per step rather than once per game and turn, as `CPUSim` calls a `Strategy`.
+
+Observations use the encoding of `PlayerPerspectiveState` as stored by `sim.replay`. The board is the
+`PlayerPerspectiveBoard` plane: 0 open, 1 the player, 2.. the other players in seat order after them. The
+hand holds `Card.id`s padded with NO_CARD. `legal` marks which hand slot may go on which row-major cell. Each
+game keeps an int8 plane of the seat owning every cell, updated from its `GameListener` events, so boards and
+legal moves are built for the whole batch with numpy rather than cell by cell.
+
+usage: python -m sim.batched --games 256 --players 2
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from lib.game import Game, GameListener
+from lib.model import DECK, Board, Card, Player
+from sim.cpu import CPUSim
+from sim.replay import FIELDS, HAND_SIZE, NO_CARD
+
+CELLS = Board.ROWS * Board.COLUMNS
+
+_LAYOUT = [cell for row in Board.new_board().cells for cell in row]
+_WILD = np.array([cell.is_wild for cell in _LAYOUT])
+# indexed by card id, NO_CARD (-1) indexes the last row, which allows nothing
+_CARD_CELLS = np.zeros((len(DECK) + 1, CELLS), dtype=bool)
+for _i, _cell in enumerate(_LAYOUT):
+    if not _cell.is_wild:
+        _CARD_CELLS[_cell.card.id, _i] = True
+_ONE_EYED = np.array([card.is_one_eyed_jack for card in DECK] + [False])
+_TWO_EYED = np.array([card.is_two_eyed_jack for card in DECK] + [False])
+
+
+@dataclass
+class ObservationBatch:
+    games: np.ndarray  # (B,) index of each game in the simulator
+    seats: np.ndarray  # (B,) seat of the player to move
+    turns: np.ndarray  # (B,) index of the turn in its game, passed turns included
+    board: np.ndarray  # (B, ROWS, COLUMNS) int8 perspective plane
+    hand: np.ndarray  # (B, HAND_SIZE) int8 card ids, NO_CARD padded
+    legal: np.ndarray  # (B, HAND_SIZE, CELLS) bool, whether the hand slot may be played on the cell
+
+    def __len__(self):
+        return len(self.games)
+
+
+# given a batch, the hand slot and the cell index chosen for each of its rows
+BatchPolicy = Callable[[ObservationBatch], Tuple[np.ndarray, np.ndarray]]
+
+
+def masked_choice(scores: np.ndarray, legal: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The legal (slot, cell) with the highest score in each row, scores shaped like `legal`"""
+    flat = np.where(legal, scores, -np.inf).reshape(len(legal), -1).argmax(axis=1)
+    return np.divmod(flat, CELLS)
+
+
+class RandomBatchPolicy:
+    """Uniform over the legal (slot, cell) pairs of each row"""
+
+    def __init__(self, seed=None):
+        self._rng = np.random.default_rng(seed)
+
+    def __call__(self, batch: ObservationBatch) -> Tuple[np.ndarray, np.ndarray]:
+        return masked_choice(self._rng.random(batch.legal.shape), batch.legal)
+
+
+class _Owners(GameListener):
+    """Keeps a game's row of `LockstepSim.owners` in step with its board"""
+
+    def __init__(self, game: Game, owners: np.ndarray):
+        self.owners = owners
+        self.codes = {player: seat + 1 for seat, player in enumerate(game.players)}
+
+    def card_played(self, player: Player, card: Card, row: int, column: int):
+        self.owners[row * Board.COLUMNS + column] = 0 if card.is_one_eyed_jack else self.codes[player]
+
+
+class LockstepSim:
+    def __init__(self, num_games: int, num_players: int, policy: BatchPolicy, seed: int = 0, record=False):
+        """Games are dealt from the seeds seed, seed + 1, ... With record, every move is kept for `episode`."""
+        self.num_players = num_players
+        self.policy = policy
+        self.games = [Game(CPUSim.CPU_NAMES[:num_players], seed=seed + i) for i in range(num_games)]
+        self.owners = np.zeros((num_games, CELLS), dtype=np.int8)  # seat + 1 owning each cell, 0 for none
+        for game, owners in zip(self.games, self.owners):
+            game.add_listener(_Owners(game, owners))
+        self.winners: List[Optional[int]] = [None] * num_games
+        self.running: List[int] = list(range(num_games))
+        self.steps = 0
+        self.policy_calls = 0
+        self.decisions = 0  # moves chosen by the policy, over all its calls
+        self._records: Optional[List[list]] = [[] for _ in self.games] if record else None
+
+    def run(self) -> int:
+        """Step until every game has a winner, return the number of steps"""
+        while self.running:
+            self.step()
+        return self.steps
+
+    def observe(self, indices: List[int]) -> ObservationBatch:
+        """Observations of the player to move in each game, whose dead cards have been exchanged"""
+        seats = np.array([(self.games[i].turns_started - 1) % self.num_players for i in indices], dtype=np.int64)
+        hand = np.full((len(indices), HAND_SIZE), NO_CARD, dtype=np.int8)
+        for row, (i, seat) in enumerate(zip(indices, seats)):
+            cards = self.games[i].players[seat].hand
+            hand[row, :len(cards)] = [card.id for card in cards]
+        owners = self.owners[indices]
+        occupied = owners > 0
+        board = np.where(occupied, (owners - 1 - seats[:, None]) % self.num_players + 1, 0).astype(np.int8)
+        open_cells = (~occupied & ~_WILD)[:, None, :]
+        opponents = (occupied & (owners != seats[:, None] + 1))[:, None, :]
+        legal = _CARD_CELLS[hand] & open_cells
+        legal |= _TWO_EYED[hand][:, :, None] & open_cells
+        legal |= _ONE_EYED[hand][:, :, None] & opponents
+        return ObservationBatch(
+            games=np.array(indices, dtype=np.int64),
+            seats=seats,
+            turns=np.array([self.games[i].turns_started - 1 for i in indices], dtype=np.int64),
+            board=board.reshape(-1, Board.ROWS, Board.COLUMNS),
+            hand=hand,
+            legal=legal,
+        )
+
+    def step(self):
+        """Play one turn in every running game, with one policy call for all players who can move"""
+        for i in self.running:
+            game = self.games[i]
+            game.exchange_dead_cards(game.next_player())
+        batch = self.observe(self.running)
+        movable = batch.legal.any(axis=(1, 2))
+        if not movable.all():  # players left with dead cards only pass
+            batch = ObservationBatch(*(getattr(batch, name)[movable] for name in batch.__dataclass_fields__))
+        if len(batch):
+            slots, cells = self.policy(batch)
+            slots, cells = np.asarray(slots), np.asarray(cells)
+            chosen = batch.legal[np.arange(len(batch)), slots, cells]
+            if not chosen.all():
+                raise ValueError(f"Policy chose illegal moves in games {batch.games[~chosen].tolist()}")
+            self.policy_calls += 1
+            self.decisions += len(batch)
+            for row, (i, seat, slot, cell) in enumerate(zip(batch.games, batch.seats, slots, cells)):
+                game = self.games[i]
+                player = game.players[seat]
+                card = player.hand[slot]
+                if self._records is not None:
+                    self._records[i].append((batch.turns[row], seat, card.id, cell, batch.hand[row], batch.board[row]))
+                game.take_turn(*divmod(int(cell), Board.COLUMNS), card, player)
+                if game.winner():
+                    self.winners[i] = int(seat)
+            self.running = [i for i in self.running if self.winners[i] is None]
+        self.steps += 1
+
+    def episode(self, i: int) -> Dict[str, np.ndarray]:
+        """The recorded moves of game i as `sim.replay` columns, numbered by its index"""
+        records = self._records[i]
+        columns = {name: np.empty((len(records),) + shape, dtype) for name, (dtype, shape) in FIELDS.items()}
+        columns["game"].fill(i)
+        for field, values in zip(("turn", "seat", "card", "cell", "hand", "board"), zip(*records)):
+            columns[field][:] = values
+        winner = self.winners[i]
+        seats = columns["seat"].astype(np.int64)
+        columns["outcome"][:] = 0 if winner is None else np.where(seats == winner, 1, -1)
+        return columns
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Play random games in lockstep and report their throughput")
+    parser.add_argument("--games", type=int, default=256, help="games advanced together")
+    parser.add_argument("--players", type=int, default=2, choices=(2, 3, 4, 6, 8, 9, 10, 12))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sim = LockstepSim(args.games, args.players, RandomBatchPolicy(args.seed), seed=args.seed)
+    start = time.perf_counter()
+    sim.run()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{args.games} games in {elapsed:.2f}s ({args.games / elapsed:.1f} games/s), {sim.policy_calls} policy calls, "
+        f"{sim.decisions / elapsed:.0f} moves/s, {sim.decisions / sim.policy_calls:.1f} moves per call on average"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Card counting: what one player can know about the cards they have not seen.
+
+A `BeliefTracker` listens to a `Game` (see `GameListener`) and keeps, for every card of the two-deck pool, how
+many copies are unseen by its player: neither in their hand nor in the discard pile. Played and exchanged cards
+are public and go to the discard pile, drawn cards are only known to the player drawing them, and a reshuffle
+returns the discard pile to the unseen cards. The unseen cards are exactly the opponents' hands and the draw
+pile, so dealing them out at random gives determinizations consistent with everything the player observed.
+
+Updates are O(1) per event, and the flat list of unseen card ids that sampling shuffles is rebuilt at most once
+after the counts change, so thousands of samples per move only pay for the shuffle.
+"""
+import array
+import random
+from typing import List, Optional, Tuple
+
+from lib.game import Game, GameListener
+from lib.model import DECK, Card, Player
+
+COPIES = 2  # Game.new_deck shuffles two decks
+
+
+class BeliefTracker(GameListener):
+    def __init__(self, game: Game, player: Player):
+        """Count from the game's current state, then follow its events. Use `attach` to do both."""
+        self.game = game
+        self.player = player
+        self.unseen = array.array('B', [COPIES] * len(DECK))  # copies by card id
+        self._discarded = array.array('B', [0] * len(DECK))  # copies in the discard pile by card id
+        for card in player.hand:
+            self.unseen[card.id] -= 1
+        for card in game.discards:
+            self.unseen[card.id] -= 1
+            self._discarded[card.id] += 1
+        self._pool: Optional[List[int]] = None
+
+    @classmethod
+    def attach(cls, game: Game, player: Player) -> 'BeliefTracker':
+        tracker = cls(game, player)
+        game.add_listener(tracker)
+        return tracker
+
+    def detach(self):
+        self.game.remove_listener(self)
+
+    def remaining(self, card: Card) -> int:
+        """Unseen copies of card, in opponents' hands or the draw pile"""
+        return self.unseen[card.id]
+
+    @property
+    def unseen_count(self) -> int:
+        return sum(self.unseen)
+
+    def card_played(self, player: Player, card: Card, row: int, column: int):
+        self._discard(player, card)
+
+    def dead_card_exchanged(self, player: Player, card: Card):
+        self._discard(player, card)
+
+    def card_drawn(self, player: Player, card: Card):
+        if player == self.player:
+            self.unseen[card.id] -= 1
+            self._pool = None
+
+    def reshuffled(self):
+        for card_id, copies in enumerate(self._discarded):
+            if copies:
+                self.unseen[card_id] += copies
+                self._discarded[card_id] = 0
+        self._pool = None
+
+    def _discard(self, player: Player, card: Card):
+        self._discarded[card.id] += 1
+        if player != self.player:  # the player's own cards were never unseen
+            self.unseen[card.id] -= 1
+            self._pool = None
+
+    def pool(self) -> List[int]:
+        """Unseen card ids, one entry per copy, in id order"""
+        if self._pool is None:
+            self._pool = [card_id for card_id, copies in enumerate(self.unseen) for _ in range(copies)]
+        return self._pool
+
+    def sample_ids(self, rng: random.Random) -> Tuple[List[List[int]], List[int]]:
+        """Deal the unseen cards at random: card ids of every seat's hand, the player's own hand as it is, and
+        the rest as the draw pile in drawing order.
+        """
+        hidden = self.pool()
+        hidden = rng.sample(hidden, len(hidden))
+        hands, dealt = [], 0
+        for player in self.game.players:
+            if player == self.player:
+                hands.append([card.id for card in player.hand])
+            else:
+                size = len(player.hand)
+                hands.append(hidden[dealt:dealt + size])
+                dealt += size
+        return hands, hidden[dealt:]
+
+    def sample_hands(self, rng: random.Random) -> List[List[Card]]:
+        """Every seat's hand in one determinization, as cards"""
+        hands, _ = self.sample_ids(rng)
+        return [[DECK[card_id] for card_id in hand] for hand in hands]
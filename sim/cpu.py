@@ -1,14 +1,14 @@
 import collections
 import itertools
 import pickle
-from collections import Callable
+import time
 from dataclasses import dataclass
-from typing import List
+from typing import List, Callable, Optional, Tuple, Type
 
-from console import ConsoleGame
 from lib.game import Game
-from lib.model import InvalidCellSelection, DeadCardError, Board, Card, Player
-from sim.strategy import StrategyProvider, RandomStrategy
+from lib.model import InvalidCellSelection, Board, Card, Player
+from sim.profiling import PhaseProfile
+from sim.strategy import StrategyProvider, RandomStrategy, TurnView
 
 
 @dataclass
@@ -30,71 +30,98 @@ class PlayerPerspectiveBoard:
 @dataclass
 class PlayerPerspectiveState:
     board: PlayerPerspectiveBoard  # the cell states
-    hand: List[Card]  # the players hand state
+    hand: List[Card]  # the players hand state, before playing the card
+    turn: int = 0  # index of the turn being played, counting passed turns
+    card: Optional[Card] = None  # the card the player chose
+    move: Optional[Tuple[int, int]] = None  # the (row, column) the card was played on
 
     @classmethod
-    def from_game(cls, game: Game, player: Player):
-        # rotate players so player of interest is index 0
+    def from_game(cls, game: Game, player: Player, card: Card = None, move: Tuple[int, int] = None):
+        # number players in seat order starting from the player of interest, who is 1
         pid = game.players.index(player)
-        player_q = collections.deque(game.players)
-        player_q.rotate(pid)
-        player_list = list(player_q)
-
-        def get_player_id(cell_player: Player):
-            return player_list.index(cell_player) + 1
+        count = len(game.players)
+        player_ids = {p: (i - pid) % count + 1 for i, p in enumerate(game.players)}
 
         board = PlayerPerspectiveBoard.from_board(
-            game.board, get_player_id
+            game.board, player_ids.__getitem__
         )
-        return cls(board=board, hand=player.hand)
+        # copy the hand, the player's list changes as soon as the card is played
+        return cls(board=board, hand=list(player.hand), turn=game.turns_started - 1, card=card, move=move)
 
 
 @dataclass
 class PlayerPerspectiveOutcome:
     states: List[PlayerPerspectiveState]
-    outcome: int
+    outcome: int  # 1 for the winner, -1 for the other players, 0 when the game has no winner
 
 
 class CPUSim:
-    CPU_NAMES = ["Abbott", "Bionicle", "Cleopatra", "David", "Erasmus", "Fergus"]
-
-    def __init__(self, num_players, strategies: StrategyProvider=None, step=False):
+    CPU_NAMES = [
+        "Abbott", "Bionicle", "Cleopatra", "David", "Erasmus", "Fergus",
+        "Gertrude", "Horatio", "Ignatius", "Jemima", "Kublai", "Lysander",
+    ]
+    # timed by a PhaseProfile: dead card exchanges, find_valid_cells for the hand, the strategy's choice,
+    # recording the PlayerPerspectiveState, playing the move and checking for a winner
+    PHASES = ("exchange", "legal_moves", "select", "capture", "take_turn", "winner")
+
+    def __init__(self, num_players, strategies: StrategyProvider=None, step=False, board_cls: Type[Board]=Board,
+                 seed: int = None, profile: Optional[PhaseProfile] = None):
         self.players = list(itertools.islice(self.CPU_NAMES, num_players))
-        self.game = Game(self.players)
-        self.strategy_provider: StrategyProvider = strategies or StrategyProvider.constant(RandomStrategy())
+        self.game = Game(self.players, board_cls=board_cls, seed=seed)
+        # by default the strategies draw from the game's rng, so that the whole game replays from its seed
+        self.strategy_provider: StrategyProvider = (
+            strategies or StrategyProvider.constant(RandomStrategy(self.game.rng))
+        )
         self._step = step
         self._replay_buffers = collections.defaultdict(list)
+        self.profile = profile
+        if profile is not None:
+            profile.games += 1
 
     def _get_strategy(self, player):
         return self.strategy_provider(player.name)
 
+    def _timed(self, phase: str, fn: Callable, *args):
+        if self.profile is None:
+            return fn(*args)
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.profile.add(phase, time.perf_counter() - start)
+
+    def _count(self, counter: str, n: int = 1):
+        if self.profile is not None:
+            self.profile.count(counter, n)
+
     def save_buffers(self, f):
         buffers = list(self._replay_buffers.values())
         pickle.dump(buffers, f)
 
+    def outcomes(self) -> List[PlayerPerspectiveOutcome]:
+        """Each player's recorded states with the game's result from their perspective, in seat order
+        """
+        winner = self.game.winner()
+        return [
+            PlayerPerspectiveOutcome(
+                states=self._replay_buffers[player],
+                outcome=0 if winner is None else 1 if winner[0] is player else -1,
+            )
+            for player in self.game.players
+        ]
+
     def run(self):
         game = self.game
         started = steps = 0
-        while not game.winner():
+        while not self._timed("winner", game.winner):
             if not self._step or steps > 0:
-                current_player = game.next_player()
-                card, moves = self.try_play_card(game, current_player)
-                while True:
-                    try:
-                        select = self._get_strategy(current_player).select_move(moves)
-                        select -= 1
-                        row, column = moves[select]
-                        state = PlayerPerspectiveState.from_game(self.game, current_player)
-                        self._replay_buffers[current_player].append(state)
-                        game.take_turn(row, column, card, current_player)
-                        break
-                    except InvalidCellSelection as e:
-                        continue
+                current_player = self.play_turn()
                 steps -= 1
             else:
                 if started:
                     cmd = input("Enter cmd [print]: ")
                     if cmd == "print":
+                        from console import ConsoleGame  # only needed when stepping through a game
                         console = ConsoleGame()
                         console._players = self.players
                         bd = console._render_board(self.game, current_player)
@@ -107,12 +134,35 @@ class CPUSim:
 
         return game.turn_count
 
-    def try_play_card(self, game: 'Game', current_player):
-        board = game.board
+    def play_turn(self) -> Player:
+        """Play a single turn for the next player, without checking for a winner
+        """
+        game = self.game
+        current_player = game.next_player()
+        self._count("turns")
+        view = self.start_turn(game, current_player)
+        if not view.playable:  # only dead cards left in hand, pass
+            self._count("passes")
+            return current_player
         while True:
-            select = self._get_strategy(current_player).select_card(current_player.hand)
-            card = current_player.select_card(select)
             try:
-                return card, board.find_valid_cells(card, current_player)
-            except DeadCardError:
-                game.exchange_dead_card(current_player, card)
\ No newline at end of file
+                card, (row, column) = self._timed("select", self._get_strategy(current_player).choose, view)
+                state = self._timed(
+                    "capture", PlayerPerspectiveState.from_game, self.game, current_player, card, (row, column)
+                )
+                self._replay_buffers[current_player].append(state)
+                self._timed("take_turn", game.take_turn, row, column, card, current_player)
+                return current_player
+            except InvalidCellSelection as e:
+                self._count("invalid_selections")
+                continue
+
+    def start_turn(self, game: 'Game', current_player) -> TurnView:
+        """Exchange the player's dead cards, and return the view of the turn with its legal moves worked out
+        """
+        dead = self._timed("exchange", game.exchange_dead_cards, current_player)
+        if dead:
+            self._count("dead_cards", len(dead))
+        view = TurnView(game, current_player)
+        self._timed("legal_moves", getattr, view, "legal_moves")
+        return view
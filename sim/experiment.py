@@ -0,0 +1,264 @@
+"""Sweep player counts and strategy pairings, summarising each condition with `sim.stats` estimators.
+
+Every condition plays the games seed, seed + 1, ... so all pairings of a player count are dealt the same cards.
+Games are played in chunks of `--chunk` and the condition stops at `--max-games`, or earlier, once at least
+`--min-games` were played and every seat's 95% win rate interval is narrower than `--ci-width`.
+
+usage: python -m sim.experiment --players 2 3 --pairings random random,random -o results.jsonl
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from lib.game import Game
+from sim.cpu import CPUSim
+from sim.headless import HeadlessSim
+from sim.stats import Distribution, WinRates
+from sim.strategy import AlphaBetaStrategy, GreedyStrategy, ISMCTSStrategy, RandomStrategy, Strategy, StrategyProvider
+
+SEARCH_ITERATIONS = 200  # ISMCTS playouts per move of the registered "ismcts"
+SEARCH_DEPTH = 2  # plies searched per move by the registered "alphabeta"
+
+
+class FixedISMCTSStrategy(ISMCTSStrategy):
+    """`ISMCTSStrategy` with a fixed number of playouts per move, so that a game only depends on its seeds"""
+
+    def __init__(self, rng: random.Random = None):
+        super().__init__(rng, iterations=SEARCH_ITERATIONS)
+
+
+class FixedAlphaBetaStrategy(AlphaBetaStrategy):
+    """`AlphaBetaStrategy` searching a fixed depth per move, so that a game only depends on its seeds. It reads
+    every hand, so it is stronger than its opponents can be with hidden hands.
+    """
+
+    def __init__(self, rng: random.Random = None):
+        super().__init__(rng, time_budget=None, max_depth=SEARCH_DEPTH)
+
+
+# strategies by name, built per game and seat from a seeded rng
+STRATEGIES: Dict[str, Callable[[random.Random], Strategy]] = {
+    "random": RandomStrategy,
+    "greedy": GreedyStrategy,
+    "ismcts": FixedISMCTSStrategy,
+    "alphabeta": FixedAlphaBetaStrategy,
+}
+PLAYER_COUNTS = (2, 3, 4, 6, 8, 9, 10, 12)  # every player count Game deals hands for
+ENGINES = ("cpu", "headless")
+
+GameResult = Tuple[int, float, Optional[int]]  # turns, seconds and the winning seat
+
+
+@dataclass(frozen=True)
+class Condition:
+    players: int
+    pairing: Tuple[str, ...]  # strategy names by seat, repeated round the table when shorter than players
+
+    def strategy_for(self, seat: int) -> str:
+        return self.pairing[seat % len(self.pairing)]
+
+    @property
+    def strategies(self) -> Tuple[str, ...]:
+        """The distinct strategy names of the pairing, in the order they first appear"""
+        return tuple(dict.fromkeys(self.pairing))
+
+    @property
+    def name(self) -> str:
+        return f"{self.players}p {','.join(self.pairing)}"
+
+
+@dataclass
+class ExperimentConfig:
+    max_games: int = 10000
+    min_games: int = 200
+    ci_width: float = 0.05  # stop once every seat's win rate interval is narrower than this, 0 to never stop early
+    chunk: int = 100
+    seed: int = 0
+    engine: str = "headless"
+    workers: Optional[int] = None  # None plays in this process, 0 for one process per core
+
+
+class ConditionResult:
+    """Streaming summary of the games of one condition, its size does not depend on the number of games"""
+
+    def __init__(self, condition: Condition):
+        self.condition = condition
+        self.turns = Distribution()
+        self.time = Distribution()
+        self.seats = WinRates(condition.players)
+        self.strategies = WinRates(len(condition.strategies))  # wins of each strategy, over all the seats playing it
+        self.elapsed = 0.0
+
+    @property
+    def games(self) -> int:
+        return self.seats.games
+
+    def add(self, result: GameResult):
+        turns, seconds, winner = result
+        self.turns.add(turns)
+        self.time.add(seconds)
+        self.seats.add(winner)
+        if winner is not None:
+            winner = self.condition.strategies.index(self.condition.strategy_for(winner))
+        self.strategies.add(winner)
+
+    def converged(self, config: ExperimentConfig) -> bool:
+        return self.games >= config.min_games and self.seats.max_width() < config.ci_width
+
+    def to_dict(self) -> dict:
+        return {
+            "players": self.condition.players,
+            "pairing": list(self.condition.pairing),
+            "games": self.games,
+            "elapsed": self.elapsed,
+            "turns": self.turns.to_dict(),
+            "time": self.time.to_dict(),
+            "win_rates": self.seats.to_dict(),
+            "strategy_win_rates": dict(zip(self.condition.strategies, self.strategies.to_dict()["seats"])),
+        }
+
+
+def play_games(condition: Condition, seeds: range, engine: str) -> List[GameResult]:
+    results = []
+    for seed in seeds:
+        strategies = {
+            name: STRATEGIES[condition.strategy_for(seat)](random.Random(f"{seed}:{seat}"))
+            for seat, name in enumerate(CPUSim.CPU_NAMES[:condition.players])
+        }
+        provider = StrategyProvider(strategies.__getitem__)
+        start = time.perf_counter()
+        try:
+            if engine == "headless":
+                sim = HeadlessSim(condition.players, provider, seed=seed)
+                turns = sim.run()
+                winner = sim.game.winner
+            else:
+                sim = CPUSim(condition.players, provider, seed=seed)
+                turns = sim.run()
+                found = sim.game.winner()
+                winner = sim.game.players.index(found[0]) if found else None
+        finally:
+            for strategy in strategies.values():
+                strategy.close()
+        results.append((turns, time.perf_counter() - start, winner))
+    return results
+
+
+def run_condition(condition: Condition, config: ExperimentConfig,
+                  executor: Optional[ProcessPoolExecutor] = None) -> ConditionResult:
+    """Play chunks of games until the condition converges or reaches max_games. Chunks are folded in the order
+    they were started, so the stopping point does not depend on which worker finished first.
+    """
+    result = ConditionResult(condition)
+    start = time.perf_counter()
+    chunks = _chunks(config)
+    if executor is None:
+        for seeds in chunks:
+            for game in play_games(condition, seeds, config.engine):
+                result.add(game)
+            if result.converged(config):
+                break
+    else:
+        pending = deque()
+        in_flight = 2 * (config.workers or os.cpu_count())
+        for seeds in itertools.islice(chunks, in_flight):
+            pending.append(executor.submit(play_games, condition, seeds, config.engine))
+        while pending:
+            for game in pending.popleft().result():
+                result.add(game)
+            if result.converged(config):
+                for future in pending:
+                    future.cancel()
+                break
+            seeds = next(chunks, None)
+            if seeds is not None:
+                pending.append(executor.submit(play_games, condition, seeds, config.engine))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _chunks(config: ExperimentConfig) -> Iterator[range]:
+    stop = config.seed + config.max_games
+    return (range(first, min(first + config.chunk, stop)) for first in range(config.seed, stop, config.chunk))
+
+
+def run_experiment(conditions: List[Condition], config: ExperimentConfig) -> Iterator[ConditionResult]:
+    if config.workers is None:
+        for condition in conditions:
+            yield run_condition(condition, config)
+        return
+    with ProcessPoolExecutor(max_workers=config.workers or None) as executor:
+        for condition in conditions:
+            yield run_condition(condition, config, executor)
+
+
+def conditions_for(player_counts: List[int], pairings: List[str], engine: str = "cpu") -> List[Condition]:
+    conditions = []
+    for players in player_counts:
+        Game.hand_size_for(players)  # KeyError for a player count the game cannot deal for
+        for pairing in pairings:
+            names = tuple(pairing.split(","))
+            unknown = [name for name in names if name not in STRATEGIES]
+            if unknown:
+                raise ValueError(f"Unknown strategies {unknown}, choose from {sorted(STRATEGIES)}")
+            board_aware = [name for name in names if STRATEGIES[name].is_board_aware()]
+            if board_aware and engine == "headless":
+                raise ValueError(f"The headless engine cannot run {board_aware}, use --engine cpu")
+            conditions.append(Condition(players, names))
+    return conditions
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Sweep player counts and strategy pairings")
+    parser.add_argument("--players", type=int, nargs="+", default=[2], choices=PLAYER_COUNTS,
+                        help="player counts to sweep")
+    parser.add_argument("--all-players", action="store_true", help="sweep every supported player count")
+    parser.add_argument("--pairings", nargs="+", default=["random"],
+                        help="comma separated strategies by seat, from: " + ", ".join(sorted(STRATEGIES)))
+    parser.add_argument("--max-games", type=int, default=ExperimentConfig.max_games)
+    parser.add_argument("--min-games", type=int, default=ExperimentConfig.min_games)
+    parser.add_argument("--ci-width", type=float, default=ExperimentConfig.ci_width,
+                        help="stop a condition once all win rate 95%% intervals are narrower, 0 to play max-games")
+    parser.add_argument("--chunk", type=int, default=ExperimentConfig.chunk, help="games between convergence checks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=ENGINES, default=ExperimentConfig.engine)
+    parser.add_argument("--workers", type=int, help="play on a process pool, 0 for one worker per core")
+    parser.add_argument("-o", "--output", help="append one JSON line per condition to this file")
+    args = parser.parse_args(argv)
+
+    config = ExperimentConfig(
+        max_games=args.max_games, min_games=args.min_games, ci_width=args.ci_width, chunk=args.chunk,
+        seed=args.seed, engine=args.engine, workers=args.workers,
+    )
+    player_counts = list(PLAYER_COUNTS) if args.all_players else args.players
+    try:
+        conditions = conditions_for(player_counts, args.pairings, config.engine)
+    except ValueError as e:
+        parser.error(str(e))
+    output = open(args.output, "a") if args.output else None
+    try:
+        for result in run_experiment(conditions, config):
+            summary = result.to_dict()
+            if output:
+                output.write(json.dumps(summary) + "\n")
+                output.flush()
+            rates = " ".join(f"{seat['rate']:.3f}" for seat in summary["win_rates"]["seats"])
+            print(
+                f"{result.condition.name:<24} games={result.games:<7} "
+                f"turns={result.turns.stats.mean:7.1f}±{result.turns.stats.ci_halfwidth():.1f} "
+                f"p50={summary['turns']['p50']:6.1f} win rates by seat: {rates}"
+            )
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Headless simulation engine keeping the whole game in flat integer arrays.
+
+`HeadlessGame` follows the rules of `lib.game.Game` (same deck, dealing, dead card exchanges, jacks and win
+condition) without building `Player`, `Cell` or `PlayerPerspectiveState` objects:
+
+- `cells`: one int per board cell, row-major. 0 is open, WILD a corner, seat + 1 an occupied cell
+- `hands`: per seat, a list of `Card.id`
+- the draw and discard piles are arrays of `Card.id`, shuffled with a `random.Random(seed)` used for nothing
+  else, so `Game(..., seed=seed)` deals and reshuffles exactly the same cards
+
+`HeadlessSim.run(cross_check=True)` replays the recorded moves through `lib.game.Game` and fails on any
+divergence.
+"""
+import array
+import copy
+import itertools
+import random
+from typing import List, Optional, Tuple
+
+from lib import matrix
+from lib.game import Game
+from lib.model import Board, Card, DECK, Wild
+from sim.cpu import CPUSim
+from sim.strategy import RandomStrategy, StrategyProvider
+
+OPEN = 0
+WILD = -1
+
+_COLUMNS = Board.COLUMNS
+_LAYOUT: Tuple[int, ...] = tuple(
+    WILD if card is Wild else card.id for row in Board._layout() for card in row
+)
+_CELLS_BY_CARD: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(i for i, card_id in enumerate(_LAYOUT) if card_id == card.id) for card in DECK
+)
+_ONE_EYED_JACKS = frozenset(card.id for card in DECK if card.is_one_eyed_jack)
+_TWO_EYED_JACKS = frozenset(card.id for card in DECK if card.is_two_eyed_jack)
+_TABLE = matrix.line_table(Board.ROWS, Board.COLUMNS, Board.SEQUENCE_LENGTH)
+_LINES_THROUGH: Tuple[Tuple[int, ...], ...] = tuple(
+    _TABLE.ids_by_coordinate[divmod(i, _COLUMNS)] for i in range(len(_LAYOUT))
+)
+_LINE_WILDS: Tuple[int, ...] = tuple(
+    sum(_LAYOUT[r * _COLUMNS + c] == WILD for r, c in line) for line in _TABLE.lines
+)
+
+Turn = Tuple[int, Optional[int], Optional[int]]  # seat, card id and cell index, or None when passing
+
+
+class HeadlessGame:
+    def __init__(self, num_players: int, seed: int):
+        self.num_players = num_players
+        self.seed = seed
+        self.win_count = Game.win_count_for(num_players)
+        self.cells = array.array('b', (WILD if card_id == WILD else OPEN for card_id in _LAYOUT))
+        self.hands: List[List[int]] = [[] for _ in range(num_players)]
+        self.turn_count = 0
+        self.winner: Optional[int] = None
+        self._rng = random.Random(seed)
+        self._deck = array.array('B', [card.id for card in DECK] * 2)
+        self._rng.shuffle(self._deck)
+        self._cursor = 0
+        self._discards = array.array('B')
+        self._open_count = self.cells.count(OPEN)
+        self._occupied_count = [0] * num_players
+        self._owned = [[0] * len(_TABLE.lines) for _ in range(num_players)]
+        self._complete = [set() for _ in range(num_players)]
+        for _ in range(Game.hand_size_for(num_players)):
+            for hand in self.hands:
+                hand.append(self._draw())
+
+    @classmethod
+    def from_game(cls, game: Game) -> 'HeadlessGame':
+        """The position of a running `Game`: its board, hands, draw pile and discards, with seats in the game's
+        player order. The rng is fresh, determinizing searches swap in their own along with the hidden cards.
+        """
+        headless = cls.__new__(cls)
+        headless.num_players = len(game.players)
+        headless.seed = game.seed
+        headless.win_count = game.win_count
+        headless.cells = array.array('b', (WILD if card_id == WILD else OPEN for card_id in _LAYOUT))
+        headless.hands = [[card.id for card in player.hand] for player in game.players]
+        headless.turn_count = game.turn_count
+        headless.winner = None
+        headless._rng = random.Random()
+        headless._deck = array.array('B', (card.id for card in game.draw_pile))
+        headless._cursor = 0
+        headless._discards = array.array('B', (card.id for card in game.discards))
+        headless._open_count = headless.cells.count(OPEN)
+        headless._occupied_count = [0] * headless.num_players
+        headless._owned = [[0] * len(_TABLE.lines) for _ in range(headless.num_players)]
+        headless._complete = [set() for _ in range(headless.num_players)]
+        seats = {player: seat for seat, player in enumerate(game.players)}
+        for r, row in enumerate(game.board.cells):
+            for c, cell in enumerate(row):
+                if cell.is_occupied:
+                    headless._set_owner(r * _COLUMNS + c, None, seats[cell.player])
+        return headless
+
+    def copy(self, rng: random.Random = None) -> 'HeadlessGame':
+        """An independent copy, drawing reshuffles from rng when given"""
+        game = copy.copy(self)
+        game.cells = array.array('b', self.cells)
+        game.hands = [list(hand) for hand in self.hands]
+        game._deck = array.array('B', self._deck)
+        game._discards = array.array('B', self._discards)
+        game._occupied_count = list(self._occupied_count)
+        game._owned = [list(owned) for owned in self._owned]
+        game._complete = [set(complete) for complete in self._complete]
+        if rng is not None:
+            game._rng = rng
+        return game
+
+    def _draw(self) -> int:
+        if self._cursor == len(self._deck):
+            self._deck, self._discards = self._discards, array.array('B')
+            self._cursor = 0
+            self._rng.shuffle(self._deck)
+        card_id = self._deck[self._cursor]
+        self._cursor += 1
+        return card_id
+
+    def _discard_and_draw(self, seat: int, card_id: int):
+        hand = self.hands[seat]
+        hand.remove(card_id)
+        self._discards.append(card_id)
+        hand.append(self._draw())
+
+    def valid_cells(self, card_id: int, seat: int) -> List[int]:
+        cells = self.cells
+        if card_id in _ONE_EYED_JACKS:
+            me = seat + 1
+            return [i for i, owner in enumerate(cells) if owner > 0 and owner != me]
+        elif card_id in _TWO_EYED_JACKS:
+            return [i for i, owner in enumerate(cells) if owner == OPEN]
+        return [i for i in _CELLS_BY_CARD[card_id] if cells[i] == OPEN]
+
+    def is_dead(self, card_id: int, seat: int) -> bool:
+        if card_id in _ONE_EYED_JACKS:
+            return sum(self._occupied_count) == self._occupied_count[seat]
+        elif card_id in _TWO_EYED_JACKS:
+            return self._open_count == 0
+        cells = self.cells
+        for i in _CELLS_BY_CARD[card_id]:
+            if cells[i] == OPEN:
+                return False
+        return True
+
+    def exchange_dead_cards(self, seat: int) -> List[int]:
+        """Same exchanges as `Game.exchange_dead_cards`, in hand order
+        """
+        dead = [card_id for card_id in self.hands[seat] if self.is_dead(card_id, seat)]
+        for card_id in dead:
+            self._discard_and_draw(seat, card_id)
+        return dead
+
+    def start_turn(self, seat: int) -> List[int]:
+        """Exchange the seat's dead cards, like `exchange_dead_cards`, and return the playable card ids in hand
+        order. Only the replacements need checking again, exchanging never revives or kills other cards.
+        """
+        hand = self.hands[seat]
+        playable, dead = [], []
+        for card_id in hand:
+            (dead if self.is_dead(card_id, seat) else playable).append(card_id)
+        for card_id in dead:
+            self._discard_and_draw(seat, card_id)
+        if dead:
+            playable.extend(card_id for card_id in hand[-len(dead):] if not self.is_dead(card_id, seat))
+        return playable
+
+    def take_turn(self, seat: int, card_id: int, cell: int):
+        self._discard_and_draw(seat, card_id)
+        if card_id in _ONE_EYED_JACKS:
+            self._set_owner(cell, self.cells[cell] - 1, None)
+        else:
+            self._set_owner(cell, None, seat)
+        self.turn_count += 1
+
+    def _set_owner(self, cell: int, previous: Optional[int], current: Optional[int]):
+        self.cells[cell] = OPEN if current is None else current + 1
+        line_ids = _LINES_THROUGH[cell]
+        if previous is not None:
+            self._occupied_count[previous] -= 1
+            self._open_count += 1
+            owned = self._owned[previous]
+            for i in line_ids:
+                owned[i] -= 1
+            self._complete[previous].difference_update(line_ids)
+        if current is not None:
+            self._occupied_count[current] += 1
+            self._open_count -= 1
+            owned = self._owned[current]
+            completed = False
+            for i in line_ids:
+                owned[i] += 1
+                if owned[i] + _LINE_WILDS[i] == _TABLE.sequence_length:
+                    self._complete[current].add(i)
+                    completed = True
+            if completed and self._sequence_count(current) >= self.win_count:
+                self.winner = current
+
+    def _sequence_count(self, seat: int) -> int:
+        lines = [_TABLE.lines[i] for i in self._complete[seat]]
+        return len(matrix._distinct_sequences(lines, self.win_count))
+
+
+class HeadlessSim:
+    """Plays a `HeadlessGame` with the same strategy interface as `CPUSim`: strategies are handed `Card`s and
+    (row, column) moves, and return indices into them.
+    """
+
+    def __init__(self, num_players, strategies: StrategyProvider = None, seed: int = 0):
+        self.names = list(itertools.islice(CPUSim.CPU_NAMES, num_players))
+        self.game = HeadlessGame(num_players, seed)
+        self.strategy_provider: StrategyProvider = strategies or StrategyProvider.constant(
+            RandomStrategy(random.Random(f"{seed}:strategy"))
+        )
+        self.turns: List[Turn] = []
+
+    def run(self, cross_check=False) -> int:
+        game = self.game
+        for seat in itertools.cycle(range(game.num_players)):
+            self.play_turn(seat)
+            if game.winner is not None:
+                break
+        if cross_check:
+            self.cross_check()
+        return game.turn_count
+
+    def play_turn(self, seat: int) -> Turn:
+        game = self.game
+        strategy = self.strategy_provider(self.names[seat])
+        playable = game.start_turn(seat)
+        if not playable:
+            turn = (seat, None, None)
+        else:
+            card_id = playable[strategy.select_card([DECK[card_id] for card_id in playable])]
+            cells = game.valid_cells(card_id, seat)
+            cell = cells[strategy.select_move([divmod(i, _COLUMNS) for i in cells])]
+            game.take_turn(seat, card_id, cell)
+            turn = (seat, card_id, cell)
+        self.turns.append(turn)
+        return turn
+
+    def cross_check(self) -> Game:
+        """Replay the recorded turns through `lib.game.Game` and check it reaches the same state
+        """
+        headless = self.game
+        game = Game(self.names, seed=headless.seed)
+        for i, (seat, card_id, cell) in enumerate(self.turns):
+            player = game.next_player()
+            _check(game.players.index(player) == seat, f"turn {i}: seat {seat} played out of order")
+            _check(not game.winner(), f"turn {i}: Game already has a winner")
+            game.exchange_dead_cards(player)
+            if card_id is None:
+                _check(not game.legal_moves(player).moves, f"turn {i}: seat {seat} passed with playable cards")
+                continue
+            row, column = divmod(cell, _COLUMNS)
+            game.take_turn(row, column, Card.from_id(card_id), player)
+        winner = game.winner()
+        _check(winner is not None and game.players.index(winner[0]) == headless.winner, "winner differs")
+        _check(game.turn_count == headless.turn_count, "turn count differs")
+        for seat, player in enumerate(game.players):
+            _check([card.id for card in player.hand] == headless.hands[seat], f"hand of seat {seat} differs")
+        for r, row in enumerate(game.board.cells):
+            for c, cell in enumerate(row):
+                if cell.is_wild:
+                    expected = WILD
+                else:
+                    expected = game.players.index(cell.player) + 1 if cell.is_occupied else OPEN
+                _check(headless.cells[r * _COLUMNS + c] == expected, f"cell {(r, c)} differs")
+        return game
+
+
+class CrossCheckError(Exception):
+    pass
+
+
+def _check(condition, message):
+    if not condition:
+        raise CrossCheckError(message)
@@ -0,0 +1,181 @@
+"""Information set Monte Carlo tree search over `sim.headless` positions.
+
+Single observer ISMCTS (Cowling, Powley and Whitehouse, 2012): the tree holds the observer's view of the game,
+and every iteration plays it out in a new determinization, where the opponents' hands and the draw pile
+order are dealt at random from the cards the observer has not seen. Only the actions legal in the
+determinization are considered, and each child counts how often it was available, which replaces the
+parent's visit count in its UCB score. Iterations end with a random playout to the end of the game.
+
+Positions are `HeadlessGame`s, copied once per iteration, so playouts run on flat arrays rather than `Game`
+objects. `search` runs in the calling process, `parallel_search` runs independent searches on a process pool
+and sums their root visit counts (root parallelization).
+"""
+import math
+import random
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sim.headless import HeadlessGame
+
+Action = Tuple[int, int]  # card id and cell index
+PASS: Action = (-1, -1)  # nothing playable, the seat only exchanged its dead cards
+
+MAX_PLAYOUT_TURNS = 400  # a playout still running after this many turns counts as a draw
+
+
+class Node:
+    __slots__ = ("seat", "children", "visits", "wins", "available")
+
+    def __init__(self, seat: int):
+        self.seat = seat  # the seat that played the action leading here
+        self.children: Dict[Action, 'Node'] = {}
+        self.visits = 0
+        self.wins = 0.0
+        self.available = 0
+
+    def select(self, actions: Sequence[Action], exploration: float) -> Action:
+        best, best_score = None, -math.inf
+        log = math.log
+        for action in actions:
+            child = self.children[action]
+            score = child.wins / child.visits + exploration * math.sqrt(log(child.available) / child.visits)
+            if score > best_score:
+                best, best_score = action, score
+        return best
+
+
+@dataclass
+class SearchResult:
+    visits: Dict[Action, int] = field(default_factory=dict)
+    iterations: int = 0
+    seconds: float = 0.0
+
+    def merge(self, other: 'SearchResult') -> 'SearchResult':
+        for action, visits in other.visits.items():
+            self.visits[action] = self.visits.get(action, 0) + visits
+        self.iterations += other.iterations
+        self.seconds = max(self.seconds, other.seconds)  # searches run side by side
+        return self
+
+    @property
+    def best(self) -> Action:
+        return max(self.visits, key=self.visits.__getitem__)
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.iterations / self.seconds if self.seconds else 0.0
+
+
+def start_turn(game: HeadlessGame, seat: int) -> List[Action]:
+    """Exchange the seat's dead cards and return its legal actions"""
+    return [
+        (card_id, cell)
+        for card_id in dict.fromkeys(game.start_turn(seat))
+        for cell in game.valid_cells(card_id, seat)
+    ]
+
+
+def determinize(root: HeadlessGame, observer: int, rng: random.Random) -> HeadlessGame:
+    """Copy root, dealing the cards the observer cannot see at random into the opponents' hands and the draw pile
+    """
+    game = root.copy(rng)
+    hidden = list(game._deck[game._cursor:])
+    for seat, hand in enumerate(game.hands):
+        if seat != observer:
+            hidden.extend(hand)
+    rng.shuffle(hidden)
+    for seat, hand in enumerate(game.hands):
+        if seat != observer:
+            size = len(hand)
+            hand[:] = hidden[:size]
+            del hidden[:size]
+    game._deck[game._cursor:] = type(game._deck)('B', hidden)
+    return game
+
+
+def playout(game: HeadlessGame, seat: int, rng: random.Random) -> Optional[int]:
+    """Play random moves from seat's turn until someone wins, return the winning seat"""
+    for _ in range(MAX_PLAYOUT_TURNS):
+        if game.winner is not None:
+            break
+        playable = game.start_turn(seat)
+        if playable:
+            card_id = playable[rng.randrange(len(playable))]
+            cells = game.valid_cells(card_id, seat)
+            game.take_turn(seat, card_id, cells[rng.randrange(len(cells))])
+        seat = (seat + 1) % game.num_players
+    return game.winner
+
+
+def search(root: HeadlessGame, observer: int, root_actions: List[Action], iterations: Optional[int] = None,
+           time_budget: Optional[float] = None, seed=None, exploration: float = 0.7) -> SearchResult:
+    """Search from the observer's turn, their dead cards already exchanged, until either budget runs out.
+
+    :param root_actions: the observer's legal actions, the only ones the root considers
+    """
+    if iterations is None and time_budget is None:
+        raise ValueError("Give the search an iteration or a time budget")
+    rng = random.Random(seed)
+    tree = Node(seat=(observer - 1) % root.num_players)
+    players = root.num_players
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget is not None else math.inf
+    done = 0
+    while (iterations is None or done < iterations) and time.perf_counter() < deadline:
+        game = determinize(root, observer, rng)
+        node, seat, path = tree, observer, [tree]
+        actions = root_actions
+        while game.winner is None:
+            if node is not tree:
+                actions = start_turn(game, seat) or [PASS]
+            untried = [action for action in actions if action not in node.children]
+            for action in actions:
+                child = node.children.get(action)
+                if child is not None:
+                    child.available += 1
+            if untried:
+                action = untried[rng.randrange(len(untried))]
+                child = node.children[action] = Node(seat)
+                child.available = 1
+            else:
+                action = node.select(actions, exploration)
+                child = node.children[action]
+            if action != PASS:
+                game.take_turn(seat, *action)
+            node = child
+            path.append(node)
+            seat = (seat + 1) % players
+            if untried:
+                break
+        winner = playout(game, seat, rng)
+        for node in path:
+            node.visits += 1
+            if winner is None:
+                node.wins += 1 / players
+            elif winner == node.seat:
+                node.wins += 1
+        done += 1
+    return SearchResult(
+        visits={action: child.visits for action, child in tree.children.items()},
+        iterations=done,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def parallel_search(executor: Executor, workers: int, root: HeadlessGame, observer: int, root_actions: List[Action],
+                    iterations: Optional[int] = None, time_budget: Optional[float] = None, seed=None,
+                    exploration: float = 0.7) -> SearchResult:
+    """Run one search per worker, splitting the iterations between them, and sum their root visit counts"""
+    rng = random.Random(seed)
+    futures = []
+    for worker in range(workers):
+        share = None if iterations is None else iterations // workers + (worker < iterations % workers)
+        futures.append(executor.submit(
+            search, root, observer, root_actions, share, time_budget, rng.getrandbits(64), exploration
+        ))
+    result = SearchResult()
+    for future in futures:
+        result.merge(future.result())
+    return result
@@ -1,61 +1,194 @@
+import argparse
 import collections
 import json
-import statistics
-import sys
+import os
+import random
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List, Optional
 
 from tqdm import tqdm
 
 from sim.cpu import CPUSim
-from sim.strategy import RandomStrategy, StrategyProvider
+from sim.headless import HeadlessSim
+from sim.profiling import PhaseProfile, ProfileSettings, run_with_cprofile
+from sim.stats import Distribution, RunningStats, WinRates
 
 
-def simulate(n, results_dir=None, stepped=False):
-    results = collections.defaultdict(lambda: collections.defaultdict(list))
-    players = 2
+@dataclass
+class GameSummary:
+    """What a finished game reports back to `simulate`, small enough to send between processes
+    """
+    index: int
+    seed: int
+    players: int
+    turns: int
+    time: float
+    winner: Optional[int]  # seat of the winning player
+    profile: Optional[PhaseProfile] = None
+
+
+def simulate(n, results_dir=None, stepped=False, workers=None, players=2, seed=0, headless=False, profile=None,
+             cprofile=None):
+    """Play n CPU games with seeds seed..seed+n-1 and print timing statistics.
+
+    :param workers: spread the games over this many processes, 0 for one per core
+    :param headless: play on the array-based `sim.headless` engine, which records no replay buffers
+    :param results_dir: write every game's replay buffers to sharded episode files, see `sim.replay`
+    :param profile: time the phases of every game, see `sim.profiling`, and write them to this JSON file
+    :param cprofile: run the game with this index under cProfile, and dump its stats to game-{index}.prof
+    """
+    if headless and (results_dir or stepped or profile or cprofile is not None):
+        raise ValueError("The headless engine cannot record, step or profile games")
     if results_dir:
         outdir = Path(results_dir)
         outdir.mkdir(exist_ok=False)
     else:
         outdir = None
-    for i in tqdm(range(n)):
-        start = time.time()
-        game = CPUSim(players, StrategyProvider.constant(RandomStrategy()), step=stepped)
+    profiling = ProfileSettings(
+        phases=profile is not None,
+        cprofile_game=cprofile,
+        cprofile_path=str(Path(f"game-{cprofile}.prof").absolute()),
+    )
+    if workers is not None:
+        games = simulate_parallel(n, players, workers or os.cpu_count(), seed, outdir, headless=headless,
+                                  profiling=profiling)
+    else:
+        games = _simulate_sequential(n, players, stepped, seed, outdir, headless, profiling)
+    results = collections.defaultdict(lambda: {
+        "time": Distribution(), "turns": Distribution(), "time_per_turn": RunningStats(), "wins": WinRates(players),
+    })
+    profiles = []
+    for summary in games:
+        data = results[summary.players]
+        data["time"].add(summary.time)
+        data["turns"].add(summary.turns)
+        data["time_per_turn"].add(summary.time / summary.turns)
+        data["wins"].add(summary.winner)
+        if summary.profile is not None:
+            profiles.append(summary)
+    _report(results)
+    if profile is not None:
+        _report_profiles(profiles, profile)
+
+
+def _episode_writer(outdir, name="episodes"):
+    if outdir is None:
+        return nullcontext()
+    from sim.replay import EpisodeWriter
+    return EpisodeWriter(outdir, name)
+
+
+def _simulate_sequential(n, players, stepped, seed, outdir, headless=False, profiling=ProfileSettings()):
+    with _episode_writer(outdir) as writer:
+        for i in tqdm(range(n)):
+            yield _play_game(players, i, seed + i, writer, stepped, headless, profiling)
+
+
+def _play_game(players, index, seed, writer, stepped=False, headless=False,
+               profiling=ProfileSettings()) -> GameSummary:
+    start = time.time()
+    if headless:
+        game = HeadlessSim(players, seed=seed)
         turns = game.run()
-        end = time.time()
-        if outdir:
-            with open(outdir / f"{i}.pickle", "wb") as f:
-                game.save_buffers(f)
-        results[players]["time"].append(end - start)
-        results[players]["turns"].append(turns)
+        return GameSummary(index, seed, players, turns, time.time() - start, game.game.winner)
+    game = CPUSim(players, step=stepped, seed=seed, profile=PhaseProfile() if profiling.phases else None)
+    if profiling.cprofile_game == index:
+        run_with_cprofile(game.run, profiling.cprofile_path)
+    else:
+        game.run()
+    return _summarize(game, index, seed, time.time() - start, writer)
+
+
+def _play_games(players, indices: range, seed, outdir, headless=False,
+                profiling=ProfileSettings()) -> List[GameSummary]:
+    # each task streams into its own shards, named after its first game
+    with _episode_writer(outdir, f"episodes-{indices.start:08d}") as writer:
+        return [_play_game(players, i, seed + i, writer, headless=headless, profiling=profiling) for i in indices]
+
+
+def _summarize(sim: CPUSim, index, seed, elapsed, writer) -> GameSummary:
+    if writer is not None:
+        writer.append(index, sim.outcomes())
+    winner = sim.game.winner()
+    return GameSummary(
+        index=index,
+        seed=seed,
+        players=len(sim.game.players),
+        turns=sim.game.turn_count,
+        time=elapsed,
+        winner=sim.game.players.index(winner[0]) if winner else None,
+        profile=sim.profile,
+    )
+
+
+def simulate_parallel(n, players, workers, seed=0, outdir=None, chunk_size=None, headless=False,
+                      profiling=ProfileSettings()):
+    """Split the games over a process pool. Each task plays a contiguous range of game indices, with seed + index
+    as the game seed, so results do not depend on how the games were scheduled.
+    """
+    chunk_size = chunk_size or max(1, n // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor, tqdm(total=n) as progress:
+        futures = [
+            executor.submit(
+                _play_games, players, range(start, min(start + chunk_size, n)), seed, outdir, headless, profiling
+            )
+            for start in range(0, n, chunk_size)
+        ]
+        for future in as_completed(futures):
+            summaries = future.result()
+            progress.update(len(summaries))
+            yield from summaries
+
+
+def _report(results):
+    """Print each player count's statistics, medians are P-square estimates once there are more than 5 games
+    """
     for pc, data in results.items():
-        meantime = statistics.mean(data['time'])
-        medtime = statistics.median(data['time'])
-        meanturn = statistics.mean(data['turns'])
-        medturn = statistics.median(data['turns'])
-        tpt = []
-        for totaltime, turns in zip(data['time'], data['turns']):
-            tpt.append(totaltime / turns)
-        meantpt = statistics.mean(tpt)
         dat = {
-            "meantime": meantime,
-            "mediantime": medtime,
-            "meanturn": meanturn,
-            "medianturn": medturn,
-            "mean_time_per_turn": meantpt,
+            "meantime": data["time"].stats.mean,
+            "mediantime": data["time"].quantiles[0.5].value,
+            "meanturn": data["turns"].stats.mean,
+            "medianturn": data["turns"].quantiles[0.5].value,
+            "mean_time_per_turn": data["time_per_turn"].mean,
+            "win_rate_by_seat": [data["wins"].rate(seat) for seat in range(data["wins"].seats)],
         }
         print(f"For {pc} players:")
         print(json.dumps(dat, indent=4))
 
-if __name__ == "__main__":
-    try:
-        outdir = sys.argv[1]
-    except:
-        outdir = None
-    try:
-        step = sys.argv[2]
-    except:
-        step = False
-    simulate(20, outdir, step)
 
+def _report_profiles(summaries: List[GameSummary], path):
+    """Write the phase profile of the whole run and of each game to path, and print the run's phase shares"""
+    total = PhaseProfile.total(summary.profile for summary in summaries)
+    games = [
+        dict(index=summary.index, seed=summary.seed, **summary.profile.to_dict())
+        for summary in sorted(summaries, key=lambda summary: summary.index)
+    ]
+    with open(path, "w") as f:
+        json.dump({"total": total.to_dict(), "games": games}, f, indent=4)
+    print("Time per phase:")
+    for phase, data in total.to_dict()["phases"].items():
+        print(f"  {phase:<12} {data['share']:6.1%}  {data['mean'] * 1e6:9.1f}us x {data['calls']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate CPU games and report timing statistics")
+    parser.add_argument("outdir", nargs="?", help="directory to write the games' replay buffers to")
+    parser.add_argument("-n", "--games", type=int, default=20)
+    parser.add_argument("-p", "--players", type=int, default=2)
+    parser.add_argument("--seed", type=int, help="seed of the first game, game i uses seed + i, random by default")
+    parser.add_argument("--step", action="store_true", help="advance games interactively")
+    parser.add_argument("--workers", type=int, help="run games on a process pool, 0 for one worker per core")
+    parser.add_argument("--headless", action="store_true", help="use the array-based headless engine")
+    parser.add_argument("--profile", metavar="JSON", help="time the phases of each game and write them here")
+    parser.add_argument("--cprofile", metavar="GAME", type=int, help="run this game under cProfile")
+    args = parser.parse_args()
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    print(f"Seed: {seed}, rerun with --seed {seed}")
+    simulate(
+        args.games, args.outdir, args.step, args.workers, args.players, seed, args.headless,
+        args.profile, args.cprofile,
+    )
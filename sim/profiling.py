@@ -0,0 +1,79 @@
+"""Per-phase timers and counters for CPU games.
+
+A `CPUSim` given a `PhaseProfile` adds the wall time of each phase of a turn to it, see `CPUSim.PHASES`, and
+counts turns, passes and dead card exchanges. Without one, the phases run untimed.
+"""
+import collections
+import cProfile
+import io
+import pstats
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class PhaseProfile:
+    def __init__(self):
+        self.times: Dict[str, float] = collections.defaultdict(float)
+        self.calls: Dict[str, int] = collections.Counter()
+        self.counters: Dict[str, int] = collections.Counter()
+        self.games = 0
+
+    def add(self, phase: str, elapsed: float):
+        self.times[phase] += elapsed
+        self.calls[phase] += 1
+
+    def count(self, counter: str, n: int = 1):
+        self.counters[counter] += n
+
+    def merge(self, other: 'PhaseProfile') -> 'PhaseProfile':
+        for phase, elapsed in other.times.items():
+            self.times[phase] += elapsed
+        self.calls.update(other.calls)
+        self.counters.update(other.counters)
+        self.games += other.games
+        return self
+
+    @classmethod
+    def total(cls, profiles: Iterable['PhaseProfile']) -> 'PhaseProfile':
+        total = cls()
+        for profile in profiles:
+            total.merge(profile)
+        return total
+
+    def to_dict(self) -> dict:
+        total = sum(self.times.values())
+        return {
+            "games": self.games,
+            "time": total,
+            "phases": {
+                phase: {
+                    "time": elapsed,
+                    "calls": self.calls[phase],
+                    "mean": elapsed / self.calls[phase],
+                    "share": elapsed / total if total else 0.0,
+                }
+                for phase, elapsed in sorted(self.times.items(), key=lambda item: -item[1])
+            },
+            "counters": dict(self.counters),
+        }
+
+
+def run_with_cprofile(fn: Callable[[], T], path: str, top: int = 25) -> T:
+    """Run fn under cProfile, dump the stats to path for pstats or snakeviz and print the slowest calls"""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn)
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+    print(out.getvalue())
+    return result
+
+
+@dataclass
+class ProfileSettings:
+    """What `sim.play.simulate` profiles"""
+    phases: bool = False  # time the phases of every game
+    cprofile_game: Optional[int] = None  # index of a game to run under cProfile
+    cprofile_path: str = "game.prof"
@@ -0,0 +1,331 @@
+"""Binary episode format for replay buffers.
+
+Every recorded `PlayerPerspectiveState` becomes one record, stored column by column: a shard is a directory
+holding one raw little-endian file per field in `FIELDS`, and record i of the shard is row i of every file.
+Episodes are appended to the open shard, which is closed once it holds `shard_size` records, so a writer
+streams any number of games without holding them in memory, and a reader can map each column straight into
+a numpy array.
+
+- `board`: the ROWS x COLUMNS int8 plane of `PlayerPerspectiveBoard`, 0 open, 1 the player, 2.. the other
+  players in seat order after them
+- `hand`: `Card.id`s of the hand before playing, padded with NO_CARD
+- `turn`, `seat`: index of the turn in the game, passed turns included, and the seat playing it
+- `card`, `cell`: the chosen action, the card id and the row-major cell index, NO_CARD when unknown
+- `outcome`: `PlayerPerspectiveOutcome.outcome` of the game, repeated on each of the player's records
+
+`format.json` in the output directory describes the fields, so files can be read without this module.
+`EpisodeDataset` maps them back, and `import_pickles` converts the per-game pickles older versions of
+`sim.play` wrote.
+"""
+import argparse
+import json
+import pickle
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from lib.game import Game
+from lib.model import Board, Card
+from sim.cpu import PlayerPerspectiveOutcome, PlayerPerspectiveState
+
+FORMAT_VERSION = 1
+FORMAT_FILE = "format.json"
+HAND_SIZE = max(Game.hand_size_for(players) for players in (2, 3, 4, 6, 8, 9, 10, 12))
+NO_CARD = -1
+
+FIELDS: Dict[str, Tuple[np.dtype, Tuple[int, ...]]] = {
+    "game": (np.dtype("<u4"), ()),
+    "turn": (np.dtype("<u2"), ()),
+    "seat": (np.dtype("u1"), ()),
+    "outcome": (np.dtype("i1"), ()),
+    "card": (np.dtype("i1"), ()),
+    "cell": (np.dtype("i1"), ()),
+    "hand": (np.dtype("i1"), (HAND_SIZE,)),
+    "board": (np.dtype("i1"), (Board.ROWS, Board.COLUMNS)),
+}
+
+
+def encode_episode(game: int, outcomes: List[PlayerPerspectiveOutcome]) -> Dict[str, np.ndarray]:
+    """Columns for all states of one game, `outcomes` in seat order as returned by `CPUSim.outcomes`
+    """
+    states = [(seat, outcome.outcome, state) for seat, outcome in enumerate(outcomes) for state in outcome.states]
+    states.sort(key=lambda item: item[2].turn)
+    count = len(states)
+    columns = {name: np.empty((count,) + shape, dtype) for name, (dtype, shape) in FIELDS.items()}
+    columns["game"].fill(game)
+    columns["hand"].fill(NO_CARD)
+    for i, (seat, outcome, state) in enumerate(states):
+        row, column = state.move
+        columns["turn"][i] = state.turn
+        columns["seat"][i] = seat
+        columns["outcome"][i] = outcome
+        columns["card"][i] = state.card.id
+        columns["cell"][i] = row * Board.COLUMNS + column
+        columns["hand"][i, :len(state.hand)] = [card.id for card in state.hand]
+    if count:
+        columns["board"][:] = np.array([state.board.cells for _, _, state in states], dtype=np.int8).reshape(
+            (count,) + FIELDS["board"][1]
+        )
+    return columns
+
+
+def write_format(directory: Union[str, Path]):
+    """Describe the fields in directory/format.json, unless another writer already did
+    """
+    description = {
+        "version": FORMAT_VERSION,
+        "fields": {name: {"dtype": dtype.str, "shape": list(shape)} for name, (dtype, shape) in FIELDS.items()},
+    }
+    try:
+        with open(Path(directory) / FORMAT_FILE, "x") as f:
+            json.dump(description, f, indent=4)
+    except FileExistsError:
+        pass
+
+
+class EpisodeWriter:
+    """Append episodes to the shards name-0000, name-0001, ... in directory. Writers sharing a directory
+    need distinct names.
+    """
+
+    def __init__(self, directory: Union[str, Path], name: str = "episodes", shard_size: int = 1 << 20):
+        self.directory = Path(directory)
+        self.name = name
+        self.shard_size = shard_size
+        self.shards: List[Path] = []
+        self.records = 0
+        self._files: Optional[Dict[str, BinaryIO]] = None
+        self._shard_records = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_format(self.directory)
+
+    def append(self, game: int, outcomes: List[PlayerPerspectiveOutcome]):
+        self.append_columns(encode_episode(game, outcomes))
+
+    def append_columns(self, columns: Dict[str, np.ndarray]):
+        """Append the records of one episode, already encoded"""
+        count = len(columns["game"])
+        if self._files is None or self._shard_records + count > self.shard_size and self._shard_records:
+            self._open_shard()
+        for name, values in columns.items():
+            self._files[name].write(values.tobytes())
+        self._shard_records += count
+        self.records += count
+
+    def _open_shard(self):
+        self._close_shard()
+        shard = self.directory / f"{self.name}-{len(self.shards):04d}"
+        shard.mkdir()
+        self._files = {name: open(shard / f"{name}.bin", "wb") for name in FIELDS}
+        self._shard_records = 0
+        self.shards.append(shard)
+
+    def _close_shard(self):
+        if self._files is not None:
+            for f in self._files.values():
+                f.close()
+            self._files = None
+
+    def close(self):
+        self._close_shard()
+
+    def __enter__(self) -> 'EpisodeWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EpisodeDataset:
+    """Random access to the records in a directory written by `EpisodeWriter`.
+
+    Every column of every shard is memory-mapped read-only, records are numbered across shards in name
+    order. Single records and whole episodes are numpy views into the mapped files, only `take` and
+    `batches` copy, as their records are scattered.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        description = json.loads((self.directory / FORMAT_FILE).read_text())
+        if description["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported episode format version {description['version']}")
+        self.fields = {
+            name: (np.dtype(field["dtype"]), tuple(field["shape"])) for name, field in description["fields"].items()
+        }
+        self._shards: List[Dict[str, np.ndarray]] = []
+        starts = []
+        records = 0
+        for shard in sorted(p for p in self.directory.iterdir() if p.is_dir()):
+            columns = self._map_shard(shard)
+            if columns is not None:
+                self._shards.append(columns)
+                starts.append(records)
+                records += len(columns["game"])
+        self._starts = np.array(starts, dtype=np.int64)
+        self._records = records
+        self._episodes: Dict[int, Tuple[int, int, int]] = {}
+        for i, columns in enumerate(self._shards):
+            games = np.asarray(columns["game"])
+            bounds = np.concatenate(([0], np.flatnonzero(games[1:] != games[:-1]) + 1, [len(games)]))
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                self._episodes[int(games[start])] = (i, int(start), int(stop))
+
+    def _map_shard(self, shard: Path) -> Optional[Dict[str, np.ndarray]]:
+        # a shard still being written may be a partial record longer in some columns, keep the complete ones
+        count = min(
+            (shard / f"{name}.bin").stat().st_size // (dtype.itemsize * int(np.prod(shape, dtype=np.int64)))
+            for name, (dtype, shape) in self.fields.items()
+        )
+        if count == 0:
+            return None
+        return {
+            name: np.memmap(shard / f"{name}.bin", dtype=dtype, mode="r", shape=(count,) + shape)
+            for name, (dtype, shape) in self.fields.items()
+        }
+
+    def __len__(self):
+        return self._records
+
+    @property
+    def games(self) -> List[int]:
+        return list(self._episodes)
+
+    def _locate(self, index: int) -> Tuple[Dict[str, np.ndarray], int]:
+        if not -self._records <= index < self._records:
+            raise IndexError(f"Record {index} out of range")
+        index %= self._records
+        shard = int(np.searchsorted(self._starts, index, side="right")) - 1
+        return self._shards[shard], index - int(self._starts[shard])
+
+    def __getitem__(self, index: int) -> Dict[str, np.ndarray]:
+        columns, local = self._locate(index)
+        return {name: column[local] for name, column in columns.items()}
+
+    def episode(self, game: int) -> Dict[str, np.ndarray]:
+        """All records of a game in turn order"""
+        shard, start, stop = self._episodes[game]
+        return {name: column[start:stop] for name, column in self._shards[shard].items()}
+
+    def step(self, game: int, turn: int) -> Dict[str, np.ndarray]:
+        """The record of the given turn of a game, KeyError when nobody played a card on that turn"""
+        shard, start, stop = self._episodes[game]
+        columns = self._shards[shard]
+        turns = columns["turn"][start:stop]
+        i = int(np.searchsorted(turns, turn))
+        if i == len(turns) or turns[i] != turn:
+            raise KeyError((game, turn))
+        return {name: column[start + i] for name, column in columns.items()}
+
+    def take(self, indices) -> Dict[str, np.ndarray]:
+        """Copy the given records, in the given order, into one array per field"""
+        indices = np.asarray(indices, dtype=np.int64) % max(self._records, 1)
+        batch = {name: np.empty((len(indices),) + shape, dtype) for name, (dtype, shape) in self.fields.items()}
+        shards = np.searchsorted(self._starts, indices, side="right") - 1
+        for shard in np.unique(shards):
+            selected = shards == shard
+            local = indices[selected] - self._starts[shard]
+            for name, column in self._shards[shard].items():
+                batch[name][selected] = column[local]
+        return batch
+
+    def batches(self, batch_size: int, shuffle=True, seed: Optional[int] = None,
+                drop_last=False) -> Iterator[Dict[str, np.ndarray]]:
+        """Mini-batches covering every record once, in a seeded random order when shuffling"""
+        order = np.random.default_rng(seed).permutation(self._records) if shuffle else np.arange(self._records)
+        stop = self._records - self._records % batch_size if drop_last else self._records
+        for start in range(0, stop, batch_size):
+            yield self.take(order[start:start + batch_size])
+
+
+def import_pickles(pickle_dir: Union[str, Path], directory: Union[str, Path], name: str = "imported",
+                   shard_size: int = 1 << 20) -> EpisodeWriter:
+    """Convert the {index}.pickle files `CPUSim.save_buffers` writes into episode shards.
+
+    The pickles hold each player's states in the order the players first moved, which is taken as the seat
+    order, and no outcome: the player who made the last move is taken as the winner. Pickles from before
+    states recorded their turn and action also share the player's final hand between all states, so only
+    their boards are kept, turns assume nobody passed, and hand, card, cell and outcome are left unknown.
+    """
+    with EpisodeWriter(directory, name, shard_size) as writer:
+        paths = sorted(Path(pickle_dir).glob("*.pickle"), key=lambda path: int(path.stem))
+        for path in paths:
+            with open(path, "rb") as f:
+                buffers = _load_buffers(f)
+            writer.append_columns(_encode_pickled(int(path.stem), buffers))
+    return writer
+
+
+class _PickledCard:
+    """Stands in for `Card` while unpickling. Cards pickled since cards were interned are rebuilt from
+    (suit, rank), older ones were dataclasses pickled as their `__dict__` and are interned after loading.
+    """
+
+    def __new__(cls, *args):
+        if args:
+            return Card(*args)
+        return super().__new__(cls)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def intern(self) -> Card:
+        return Card(self.suit, self.rank)
+
+
+class _BufferUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) == ("lib.model", "Card"):
+            return _PickledCard
+        return super().find_class(module, name)
+
+
+def _load_buffers(f: BinaryIO) -> List[List[PlayerPerspectiveState]]:
+    buffers = _BufferUnpickler(f).load()
+    for states in buffers:
+        for state in states:
+            state.hand = [card.intern() if isinstance(card, _PickledCard) else card for card in state.hand]
+            if isinstance(state.card, _PickledCard):
+                state.card = state.card.intern()
+    return buffers
+
+
+def _encode_pickled(game: int, buffers: List[List[PlayerPerspectiveState]]) -> Dict[str, np.ndarray]:
+    if not all(state.card is not None for states in buffers for state in states):
+        return _encode_legacy(game, buffers)
+    columns = encode_episode(game, [PlayerPerspectiveOutcome(states, 0) for states in buffers])
+    if len(columns["seat"]):
+        # games only end on the move completing the winner's last sequence
+        columns["outcome"][:] = np.where(columns["seat"] == columns["seat"][-1], 1, -1)
+    return columns
+
+
+def _encode_legacy(game: int, buffers: List[List[PlayerPerspectiveState]]) -> Dict[str, np.ndarray]:
+    players = len(buffers)
+    states = sorted(
+        ((j * players + seat, seat, state) for seat, states in enumerate(buffers) for j, state in enumerate(states)),
+        key=lambda item: item[0],
+    )
+    count = len(states)
+    columns = {name: np.empty((count,) + shape, dtype) for name, (dtype, shape) in FIELDS.items()}
+    columns["game"].fill(game)
+    columns["outcome"].fill(0)
+    for name in ("card", "cell", "hand"):
+        columns[name].fill(NO_CARD)
+    for i, (turn, seat, state) in enumerate(states):
+        columns["turn"][i] = turn
+        columns["seat"][i] = seat
+        # these boards numbered the other players rotating the seats the wrong way round, renumber them
+        cells = np.array(state.board.cells, dtype=np.int8).reshape(FIELDS["board"][1])
+        columns["board"][i] = np.where(cells > 0, (cells - 1 - 2 * seat) % players + 1, cells)
+    return columns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a directory of per-game replay pickles to episode shards")
+    parser.add_argument("pickle_dir", help="directory of {index}.pickle files written by sim/play.py")
+    parser.add_argument("outdir", help="directory to write the episode shards to")
+    parser.add_argument("--shard-size", type=int, default=1 << 20, help="records per shard")
+    args = parser.parse_args()
+    writer = import_pickles(args.pickle_dir, args.outdir, shard_size=args.shard_size)
+    print(f"Imported {writer.records} records into {len(writer.shards)} shards")
@@ -0,0 +1,181 @@
+"""Constant-memory estimators for summarising any number of games.
+
+- `RunningStats`: count, mean, variance and extremes, Welford's update, mergeable across processes
+- `P2Quantile`: one approximate quantile from five markers, the P-square algorithm of Jain and Chlamtac
+- `WinRates`: wins per seat with Wilson score intervals
+"""
+import collections
+import math
+from typing import Dict, Iterable, List, Tuple
+
+Z_95 = 1.959963984540054
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self._m2 += other._m2 + delta * delta * self.count * other.count / count
+            self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Sample variance, 0 with fewer than two values"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def ci_halfwidth(self, z: float = Z_95) -> float:
+        """Half the width of the normal confidence interval of the mean, infinite with fewer than two values"""
+        return z * self.stdev / math.sqrt(self.count) if self.count > 1 else math.inf
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "stdev": self.stdev,
+            "ci95": self.ci_halfwidth(),
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class P2Quantile:
+    """Estimate the p-quantile of a stream: exact for the first five values, then five markers follow the
+    minimum, p/2, p, (1+p)/2 quantiles and the maximum, adjusted by piecewise-parabolic interpolation.
+    """
+
+    def __init__(self, p: float):
+        if not 0 < p < 1:
+            raise ValueError(f"Quantile must be between 0 and 1, got {p}")
+        self.p = p
+        self.count = 0
+        self._heights: List[float] = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        self.count += 1
+        q = self._heights
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+        n = self._positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(1, 5) if x < q[i]) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if d >= 1 and n[i + 1] - n[i] > 1 or d <= -1 and n[i - 1] - n[i] < -1:
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    @property
+    def value(self) -> float:
+        if self.count > 5:
+            return self._heights[2]
+        if not self._heights:
+            return math.nan
+        return self._heights[round(self.p * (len(self._heights) - 1))]
+
+
+class Distribution:
+    """`RunningStats` plus a few `P2Quantile`s of the same stream"""
+
+    def __init__(self, quantiles: Iterable[float] = (0.5, 0.9, 0.99)):
+        self.stats = RunningStats()
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    def add(self, x: float):
+        self.stats.add(x)
+        for quantile in self.quantiles.values():
+            quantile.add(x)
+
+    def to_dict(self) -> dict:
+        summary = self.stats.to_dict()
+        summary.update({f"p{p * 100:g}": quantile.value for p, quantile in self.quantiles.items()})
+        return summary
+
+
+class WinRates:
+    def __init__(self, seats: int):
+        self.seats = seats
+        self.games = 0
+        self.wins: Dict[int, int] = collections.Counter()
+
+    def add(self, winner):
+        """Count a game won by the seat `winner`, None for a game without a winner"""
+        self.games += 1
+        if winner is not None:
+            self.wins[winner] += 1
+
+    def merge(self, other: 'WinRates') -> 'WinRates':
+        self.games += other.games
+        self.wins.update(other.wins)
+        return self
+
+    def rate(self, seat: int) -> float:
+        return self.wins[seat] / self.games if self.games else math.nan
+
+    def interval(self, seat: int, z: float = Z_95) -> Tuple[float, float]:
+        """Wilson score interval of the seat's win rate, which stays sensible for rates near 0 and 1"""
+        n = self.games
+        if not n:
+            return 0.0, 1.0
+        p = self.wins[seat] / n
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        halfwidth = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return center - halfwidth, center + halfwidth
+
+    def max_width(self, z: float = Z_95) -> float:
+        """Widest interval over all seats"""
+        return max(high - low for low, high in (self.interval(seat, z) for seat in range(self.seats)))
+
+    def to_dict(self) -> dict:
+        return {
+            "games": self.games,
+            "seats": [
+                {"wins": self.wins[seat], "rate": self.rate(seat), "ci95": list(self.interval(seat))}
+                for seat in range(self.seats)
+            ],
+        }
@@ -1,4 +1,99 @@
 import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from typing import Dict, List, Optional, Set, Tuple
+
+from lib.game import Game
+from lib.model import Board, Card, HandMoves, Player, Rank
+from lib.zobrist import TranspositionCache
+
+Choice = Tuple[Card, Tuple[int, int]]  # the card to play and the (row, column) to play it on
+
+
+class TurnView:
+    """What a player knows at the start of their turn, after exchanging dead cards.
+
+    Building one only stores references, every feature is computed on first use and cached, so all strategies
+    consulted during the turn share the work. The view must be treated as read-only: clone the board or game
+    before trying moves on them.
+    """
+
+    def __init__(self, game: Game, player: Player):
+        self.game = game
+        self.player = player
+        self._cells_needing: Dict[int, Set[Tuple[int, int]]] = {}
+
+    @property
+    def board(self) -> Board:
+        return self.game.board
+
+    @property
+    def win_count(self) -> int:
+        return self.game.win_count
+
+    @cached_property
+    def hand(self) -> Tuple[Card, ...]:
+        return tuple(self.player.hand)
+
+    @cached_property
+    def discards(self) -> Tuple[Card, ...]:
+        return tuple(self.game.discards)
+
+    @cached_property
+    def opponents(self) -> Tuple[Player, ...]:
+        return tuple(p for p in self.game.players if p is not self.player)
+
+    @cached_property
+    def legal_moves(self) -> HandMoves:
+        return self.game.legal_moves(self.player)
+
+    @cached_property
+    def playable(self) -> List[Card]:
+        """Cards with at least one move, in hand order"""
+        moves = self.legal_moves.moves
+        return [card for card in self.hand if card in moves]
+
+    @property
+    def dead_cards(self) -> List[Card]:
+        return self.legal_moves.dead
+
+    def moves_for(self, card: Card) -> List[Tuple[int, int]]:
+        return self.legal_moves.moves[card]
+
+    @cached_property
+    def move_pairs(self) -> List[Choice]:
+        return list(self.legal_moves.pairs())
+
+    @cached_property
+    def completing_cells(self) -> Set[Tuple[int, int]]:
+        """Open cells completing a sequence for the player"""
+        return self.board.completing_cells(self.player)
+
+    @cached_property
+    def blocking_cells(self) -> Set[Tuple[int, int]]:
+        """Open cells completing a sequence for an opponent"""
+        return self.board.blocking_cells(self.player)
+
+    @cached_property
+    def line_counts(self) -> Dict[int, int]:
+        """Number of open lines by how many more cells the player needs on them"""
+        return {
+            k: len(self.board.lines_needing(self.player, k))
+            for k in range(1, self.board.SEQUENCE_LENGTH + 1)
+        }
+
+    def cells_needing(self, k: int) -> Set[Tuple[int, int]]:
+        """Open cells on lines where the player needs k more cells, cached per k"""
+        cells = self._cells_needing.get(k)
+        if cells is None:
+            cells = self._cells_needing[k] = self.board.cells_needing(self.player, k)
+        return cells
+
+    @cached_property
+    def sequence_counts(self) -> Dict[Player, int]:
+        return {
+            p: sum(1 for _ in self.board.find_sequences_for_player(p, self.win_count)) for p in self.game.players
+        }
 
 
 class Strategy:
@@ -8,16 +103,163 @@ class Strategy:
     def select_move(self, moves) -> int:
         pass
 
+    def choose(self, view: TurnView) -> Choice:
+        """Pick the card to play and its cell. By default the card comes from `select_card` over the playable
+        cards and the cell from `select_move` over its moves, so strategies that only look at those lists
+        keep working, board-aware strategies override this.
+        """
+        playable = view.playable
+        card = playable[self.select_card(playable)]
+        moves = view.moves_for(card)
+        return card, moves[self.select_move(moves)]
+
+    @classmethod
+    def is_board_aware(cls) -> bool:
+        """Whether the strategy overrides `choose`, engines that only offer card and move lists cannot run it"""
+        return cls.choose is not Strategy.choose
+
+    def close(self):
+        """Release what the strategy holds on to between moves, such as worker processes"""
+        pass
+
+    def __enter__(self) -> 'Strategy':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 class RandomStrategy(Strategy):
     """Selects a random card, and a random move
     """
 
+    def __init__(self, rng: random.Random = None):
+        self._rng = rng or random
+
     def select_card(self, hand) -> int:
-        return random.randint(0, len(hand)-1)
+        return self._rng.randint(0, len(hand)-1)
 
     def select_move(self, moves) -> int:
-        return random.randint(0, len(moves)-1)
+        return self._rng.randint(0, len(moves)-1)
+
+
+class GreedyStrategy(RandomStrategy):
+    """Completes a sequence when it can, otherwise blocks an opponent's, otherwise extends the line closest to
+    completion. Ties are broken at random, and a jack is only spent when no other card reaches the same tier.
+    """
+
+    def choose(self, view: TurnView) -> Choice:
+        tiers = [view.completing_cells, view.blocking_cells]
+        tiers.extend(view.cells_needing(k) for k in range(2, view.board.SEQUENCE_LENGTH + 1))
+        for cells in tiers:
+            options = [(card, cell) for card, cell in view.move_pairs if cell in cells]
+            if options:
+                regular = [option for option in options if option[0].rank != Rank.JACK]
+                return self._rng.choice(regular or options)
+        return self._rng.choice(view.move_pairs)
+
+
+class ISMCTSStrategy(Strategy):
+    """Information set Monte Carlo tree search, see `sim.ismcts`. Each move searches until the iteration or the
+    time budget runs out, on `workers` processes when more than one, and plays the most visited action.
+    `report` sums up the searches so far, with their playouts per second. The worker pool is started on the
+    first search and kept until `close`, use the strategy as a context manager to have it shut down.
+    """
+
+    def __init__(self, rng: random.Random = None, time_budget: Optional[float] = None,
+                 iterations: Optional[int] = None, workers: int = 1, exploration: float = 0.7):
+        if time_budget is None and iterations is None:
+            time_budget = 1.0
+        self._rng = rng or random.Random()
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.workers = workers
+        self.exploration = exploration
+        self.searches = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def choose(self, view: TurnView) -> Choice:
+        from sim import ismcts
+        from sim.headless import HeadlessGame
+
+        columns = view.board.COLUMNS
+        root_actions = [(card.id, row * columns + column) for card, (row, column) in view.move_pairs]
+        if len(root_actions) == 1:
+            card, cell = view.move_pairs[0]
+            return card, cell
+        root = HeadlessGame.from_game(view.game)
+        observer = view.game.players.index(view.player)
+        budget = dict(iterations=self.iterations, time_budget=self.time_budget, exploration=self.exploration)
+        if self.workers > 1:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            result = ismcts.parallel_search(
+                self._executor, self.workers, root, observer, root_actions, seed=self._rng.getrandbits(64), **budget
+            )
+        else:
+            result = ismcts.search(root, observer, root_actions, seed=self._rng.getrandbits(64), **budget)
+        self.searches.append((result.iterations, result.seconds))
+        card_id, cell = result.best
+        return Card.from_id(card_id), divmod(cell, columns)
+
+    def report(self) -> dict:
+        iterations = sum(i for i, _ in self.searches)
+        seconds = sum(s for _, s in self.searches)
+        return {
+            "moves": len(self.searches),
+            "playouts": iterations,
+            "seconds": seconds,
+            "playouts_per_second": iterations / seconds if seconds else 0.0,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class AlphaBetaStrategy(Strategy):
+    """Alpha-beta search of the open-hand variant, see `sim.alphabeta`. It reads every player's hand, so it only
+    plays fair where hands are public. Each move deepens until the time budget runs out or max_depth is reached,
+    reusing one transposition table across moves. `report` sums up the nodes per second and depths reached.
+    """
+
+    def __init__(self, rng: random.Random = None, time_budget: Optional[float] = 1.0,
+                 max_depth: Optional[int] = None, cache_size: int = 2 ** 16):
+        self._rng = rng or random.Random()
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.searches = []
+        self._cache = TranspositionCache(cache_size)
+
+    def choose(self, view: TurnView) -> Choice:
+        from sim import alphabeta
+
+        moves = list(view.move_pairs)
+        if len(moves) == 1:
+            return moves[0]
+        self._rng.shuffle(moves)  # ties go to whichever move the ordering tries first
+        game = view.game
+        search = alphabeta.AlphaBeta(
+            game.board.clone(), game.players, [list(player.hand) for player in game.players], game.win_count,
+            game.players.index(view.player), self._cache,
+        )
+        result = search.search(moves, time_budget=self.time_budget, max_depth=self.max_depth)
+        self.searches.append((result.nodes, result.seconds, result.depth))
+        return result.move
+
+    def report(self) -> dict:
+        nodes = sum(n for n, _, _ in self.searches)
+        seconds = sum(s for _, s, _ in self.searches)
+        depths = [d for _, _, d in self.searches]
+        return {
+            "moves": len(self.searches),
+            "nodes": nodes,
+            "seconds": seconds,
+            "nodes_per_second": nodes / seconds if seconds else 0.0,
+            "mean_depth": sum(depths) / len(depths) if depths else 0.0,
+            "max_depth": max(depths, default=0),
+        }
 
 
 class StrategyProvider:
@@ -33,4 +275,4 @@ class StrategyProvider:
     @classmethod
     def constant(cls, strategy: Strategy):
         provider = StrategyProvider(lambda _: strategy)
-        return provider
\ No newline at end of file
+        return provider
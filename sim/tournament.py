@@ -0,0 +1,285 @@
+"""Round-robin tournament between the strategies registered in `sim.experiment.STRATEGIES`.
+
+Every pair of strategies meets at every player count, the seats split between them in alternation round the
+table, in every rotation and with either strategy first, so neither gains from seat order. Games are played on
+`CPUSim` in chunks, one chunk playing each seat order once per seed, and a pairing stops as soon as a sequential
+probability ratio test (SPRT) decides which strategy is stronger, or after `--max-games`. Compute thus goes to
+the close matchups. The test is between the first strategy being `--elo` Elo weaker (H0) or stronger (H1),
+games without a winner count for neither hypothesis.
+
+Chunks of a pairing are folded in the order they were started, so where a pairing stops does not depend on which
+worker finished first. Ratings are fitted to all results at once by maximum likelihood (Bradley-Terry, on the
+Elo scale, averaging 1500), so they do not depend on the order either.
+
+usage: python -m sim.tournament --strategies random greedy --players 2 3 --workers 0 -o tournament.json
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lib.game import Game
+from sim.cpu import CPUSim
+from sim.experiment import PLAYER_COUNTS, STRATEGIES
+from sim.stats import RunningStats
+from sim.strategy import StrategyProvider
+
+INITIAL_RATING = 1500.0
+
+ChunkResult = List[Tuple[Optional[int], int]]  # for each game, the winning strategy index (or None) and turns
+
+
+@dataclass(frozen=True)
+class Pairing:
+    players: int
+    strategies: Tuple[str, str]
+
+    def seat_orders(self) -> List[Tuple[int, ...]]:
+        """Strategy index by seat: alternating round the table, every rotation, either strategy first"""
+        orders = []
+        for first in (0, 1):
+            pattern = tuple((first + seat) % 2 for seat in range(self.players))
+            for shift in range(self.players):
+                order = pattern[shift:] + pattern[:shift]
+                if order not in orders:
+                    orders.append(order)
+        return orders
+
+    @property
+    def name(self) -> str:
+        return f"{self.players}p {self.strategies[0]} vs {self.strategies[1]}"
+
+
+@dataclass
+class SPRT:
+    """Sequential probability ratio test of a win probability, with the hypotheses given in Elo"""
+    elo0: float = -30.0
+    elo1: float = 30.0
+    alpha: float = 0.05  # false positive rate, deciding H1 when H0 holds
+    beta: float = 0.05  # false negative rate
+
+    @staticmethod
+    def probability(elo: float) -> float:
+        return 1 / (1 + 10 ** (-elo / 400))
+
+    def llr(self, wins: int, losses: int) -> float:
+        p0, p1 = self.probability(self.elo0), self.probability(self.elo1)
+        return wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        return math.log(self.beta / (1 - self.alpha)), math.log((1 - self.beta) / self.alpha)
+
+    def decide(self, wins: int, losses: int) -> Optional[bool]:
+        """True once H1 is accepted, False once H0 is, None while undecided"""
+        llr = self.llr(wins, losses)
+        lower, upper = self.bounds
+        if llr >= upper:
+            return True
+        if llr <= lower:
+            return False
+        return None
+
+
+@dataclass
+class TournamentConfig:
+    max_games: int = 2000  # per pairing, over all its seat orders
+    chunk: int = 2  # seeds per chunk, each played once per seat order
+    seed: int = 0
+    workers: Optional[int] = None  # None plays in this process, 0 for one process per core
+    sprt: SPRT = field(default_factory=SPRT)
+
+
+class PairingResult:
+    def __init__(self, pairing: Pairing):
+        self.pairing = pairing
+        self.wins = [0, 0]
+        self.draws = 0
+        self.turns = RunningStats()
+        self.decision: Optional[bool] = None  # whether the first strategy is the stronger one, None if undecided
+
+    @property
+    def games(self) -> int:
+        return self.wins[0] + self.wins[1] + self.draws
+
+    @property
+    def score(self) -> float:
+        """Points of the first strategy per game, a draw counting half"""
+        return (self.wins[0] + self.draws / 2) / self.games if self.games else math.nan
+
+    def add(self, winner: Optional[int], turns: int):
+        if winner is None:
+            self.draws += 1
+        else:
+            self.wins[winner] += 1
+        self.turns.add(turns)
+
+    def to_dict(self, sprt: SPRT) -> dict:
+        a, b = self.pairing.strategies
+        return {
+            "players": self.pairing.players,
+            "strategies": [a, b],
+            "games": self.games,
+            "wins": {a: self.wins[0], b: self.wins[1]},
+            "draws": self.draws,
+            "score": self.score,
+            "llr": sprt.llr(*self.wins),
+            "stronger": None if self.decision is None else a if self.decision else b,
+            "turns": self.turns.to_dict(),
+        }
+
+
+def play_chunk(pairing: Pairing, seeds: range) -> ChunkResult:
+    results = []
+    for seed in seeds:
+        for order in pairing.seat_orders():
+            strategies = {
+                name: STRATEGIES[pairing.strategies[index]](random.Random(f"{seed}:{seat}"))
+                for seat, (name, index) in enumerate(zip(CPUSim.CPU_NAMES, order))
+            }
+            sim = CPUSim(pairing.players, StrategyProvider(strategies.__getitem__), seed=seed)
+            try:
+                turns = sim.run()
+            finally:
+                for strategy in strategies.values():
+                    strategy.close()
+            winner = sim.game.winner()
+            results.append((None if winner is None else order[sim.game.players.index(winner[0])], turns))
+    return results
+
+
+def _chunks(pairing: Pairing, config: TournamentConfig) -> Iterator[range]:
+    chunks = max(1, math.ceil(config.max_games / (config.chunk * len(pairing.seat_orders()))))
+    return (range(config.seed + i * config.chunk, config.seed + (i + 1) * config.chunk) for i in range(chunks))
+
+
+def _fold(result: PairingResult, games: ChunkResult, config: TournamentConfig) -> bool:
+    """Add a chunk's games, return whether the pairing is finished"""
+    for winner, turns in games:
+        result.add(winner, turns)
+    result.decision = config.sprt.decide(*result.wins)
+    return result.decision is not None or result.games >= config.max_games
+
+
+def run_tournament(pairings: List[Pairing], config: TournamentConfig) -> List[PairingResult]:
+    results = {pairing: PairingResult(pairing) for pairing in pairings}
+    chunks = {pairing: _chunks(pairing, config) for pairing in pairings}
+    if config.workers is None:
+        for pairing in pairings:
+            for seeds in chunks[pairing]:
+                if _fold(results[pairing], play_chunk(pairing, seeds), config):
+                    break
+        return [results[pairing] for pairing in pairings]
+
+    pending: Dict[Pairing, Deque[Future]] = {pairing: deque() for pairing in pairings}
+    open_pairings = list(pairings)  # undecided, with chunks left to start
+    in_flight = 2 * (config.workers or os.cpu_count())
+    with ProcessPoolExecutor(max_workers=config.workers or None) as executor:
+        turn = itertools.count()
+        while True:
+            # start chunks round robin over the undecided pairings, so the pool stays busy with them
+            while open_pairings and sum(map(len, pending.values())) < in_flight:
+                pairing = open_pairings[next(turn) % len(open_pairings)]
+                seeds = next(chunks[pairing], None)
+                if seeds is None:
+                    open_pairings.remove(pairing)
+                else:
+                    pending[pairing].append(executor.submit(play_chunk, pairing, seeds))
+            futures = [future for queue in pending.values() for future in queue]
+            if not futures:
+                break
+            wait(futures, return_when=FIRST_COMPLETED)
+            for pairing, queue in pending.items():
+                while queue and queue[0].done():
+                    if _fold(results[pairing], queue.popleft().result(), config):
+                        for future in queue:
+                            future.cancel()
+                        queue.clear()
+                        if pairing in open_pairings:
+                            open_pairings.remove(pairing)
+    return [results[pairing] for pairing in pairings]
+
+
+def fit_ratings(results: Iterable[PairingResult], iterations: int = 1000, tolerance: float = 1e-9
+                ) -> Dict[str, float]:
+    """Elo ratings maximising the likelihood of the results under the Bradley-Terry model, fitted with Hunter's
+    minorization-maximization updates. A draw counts as half a win for each side, and every pair that met gets
+    one more virtual draw, so that a strategy that never won still has a finite rating.
+    """
+    wins: Dict[str, float] = {}
+    games: Dict[Tuple[str, str], float] = {}
+    for result in results:
+        a, b = result.pairing.strategies
+        wins[a] = wins.get(a, 0.0) + result.wins[0] + result.draws / 2 + 0.5
+        wins[b] = wins.get(b, 0.0) + result.wins[1] + result.draws / 2 + 0.5
+        for pair in ((a, b), (b, a)):
+            games[pair] = games.get(pair, 0.0) + result.games + 1
+    strength = {name: 1.0 for name in wins}
+    for _ in range(iterations):
+        updated = {
+            name: wins[name] / sum(n / (strength[name] + strength[b]) for (a, b), n in games.items() if a == name)
+            for name in strength
+        }
+        scale = math.exp(sum(math.log(s) for s in updated.values()) / len(updated))  # geometric mean 1
+        updated = {name: s / scale for name, s in updated.items()}
+        converged = max(abs(math.log(updated[name] / strength[name])) for name in strength) < tolerance
+        strength = updated
+        if converged:
+            break
+    return {name: INITIAL_RATING + 400 * math.log10(s) for name, s in strength.items()}
+
+
+def pairings_for(player_counts: List[int], strategies: List[str]) -> List[Pairing]:
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies {unknown}, choose from {sorted(STRATEGIES)}")
+    pairings = []
+    for players in player_counts:
+        Game.hand_size_for(players)  # KeyError for a player count the game cannot deal for
+        for pair in itertools.combinations(dict.fromkeys(strategies), 2):
+            pairings.append(Pairing(players, pair))
+    return pairings
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Round-robin tournament between the registered strategies")
+    parser.add_argument("--strategies", nargs="+", default=sorted(STRATEGIES), choices=sorted(STRATEGIES))
+    parser.add_argument("--players", type=int, nargs="+", default=list(PLAYER_COUNTS), choices=PLAYER_COUNTS)
+    parser.add_argument("--max-games", type=int, default=TournamentConfig.max_games, help="games per pairing")
+    parser.add_argument("--chunk", type=int, default=TournamentConfig.chunk,
+                        help="seeds per chunk, each played in every seat order")
+    parser.add_argument("--elo", type=float, default=SPRT.elo1, help="SPRT tests -elo against +elo")
+    parser.add_argument("--alpha", type=float, default=SPRT.alpha)
+    parser.add_argument("--beta", type=float, default=SPRT.beta)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="play on a process pool, 0 for one worker per core")
+    parser.add_argument("-o", "--output", help="write the results and ratings as JSON")
+    args = parser.parse_args(argv)
+
+    sprt = SPRT(-args.elo, args.elo, args.alpha, args.beta)
+    config = TournamentConfig(args.max_games, args.chunk, args.seed, args.workers, sprt)
+    results = run_tournament(pairings_for(args.players, args.strategies), config)
+    for result in results:
+        summary = result.to_dict(sprt)
+        print(
+            f"{result.pairing.name:<28} games={result.games:<6} score={result.score:.3f} "
+            f"llr={summary['llr']:+6.2f} stronger: {summary['stronger'] or 'undecided'}"
+        )
+    ratings = {"all": fit_ratings(results)}
+    for players in args.players:
+        ratings[f"{players}p"] = fit_ratings(result for result in results if result.pairing.players == players)
+    for name, rating in sorted(ratings["all"].items(), key=lambda item: -item[1]):
+        print(f"{name:<12} {rating:7.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"pairings": [result.to_dict(sprt) for result in results], "ratings": ratings}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
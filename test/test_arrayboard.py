@@ -0,0 +1,44 @@
+import random
+
+import numpy as np
+
+from lib import matrix
+from lib.arrayboard import ArrayBoard, encode, sequence_counts, winners
+from lib.model import Board, Player
+
+
+if __name__ == "__main__":
+    players = [Player("0", "zero"), Player("1", "one"), Player("2", "two")]
+
+    def random_board(density, player_count):
+        board = Board.new_board()
+        for row in board.cells:
+            for cell in row:
+                if not cell.is_wild and random.random() < density:
+                    cell.player = random.choice(players[:player_count])
+        return board
+
+    def expected_counts(board, win_count):
+        counts = []
+        for player in players:
+            def condition(cell):
+                return cell.player == player or cell.is_wild
+            counts.append(len(matrix.get_valid_sequences(board.cells, Board.SEQUENCE_LENGTH, condition, win_count)))
+        return counts
+
+    random.seed(0)
+    boards = [
+        random_board(density, player_count)
+        for density in (0.2, 0.5, 0.8, 0.95)
+        for player_count in (1, 2, 3)
+        for _ in range(20)
+    ]
+    stack = np.stack([encode(board, players) for board in boards])
+    counts = sequence_counts(stack, len(players))
+    for board, found in zip(boards, counts):
+        assert list(found) == expected_counts(board, 100), (list(found), expected_counts(board, 100))
+    for board, winner in zip(boards, winners(stack, len(players), 2)):
+        winning = [i for i, count in enumerate(expected_counts(board, 2), 1) if count >= 2]
+        assert (winner in winning) if winning else winner == 0, (winner, winning)
+        array_board = ArrayBoard(board.cells)
+        assert (array_board.array == encode(board, array_board.players)).all()
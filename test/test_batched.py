@@ -0,0 +1,56 @@
+import tempfile
+
+import numpy as np
+
+from lib.model import Board
+from sim.batched import LockstepSim, RandomBatchPolicy
+from sim.cpu import PlayerPerspectiveState
+from sim.replay import EpisodeDataset, EpisodeWriter
+
+
+class CheckedPolicy(RandomBatchPolicy):
+    """Random moves, checking every observation against the `Game` it came from"""
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.sim = None
+        self.rows = 0
+
+    def __call__(self, batch):
+        for row, (i, seat) in enumerate(zip(batch.games, batch.seats)):
+            game = self.sim.games[i]
+            player = game.players[seat]
+            state = PlayerPerspectiveState.from_game(game, player)
+            assert batch.board[row].ravel().tolist() == state.board.cells
+            assert batch.turns[row] == state.turn
+            hand = [card.id for card in player.hand]
+            assert batch.hand[row, :len(hand)].tolist() == hand and (batch.hand[row, len(hand):] == -1).all()
+            moves = game.legal_moves(player).moves
+            for slot, card in enumerate(player.hand):
+                expected = {r * Board.COLUMNS + c for r, c in moves.get(card, ())}
+                assert set(np.flatnonzero(batch.legal[row, slot])) == expected, (i, seat, card)
+            self.rows += 1
+        return super().__call__(batch)
+
+
+if __name__ == "__main__":
+    for players in (2, 3):
+        policy = CheckedPolicy(players)
+        sim = LockstepSim(12, players, policy, seed=100, record=True)
+        policy.sim = sim
+        sim.run()
+        assert all(winner is not None for winner in sim.winners)
+        assert policy.rows == sim.decisions == sum(game.turn_count for game in sim.games)
+        for i, game in enumerate(sim.games):
+            assert game.players.index(game.winner()[0]) == sim.winners[i]
+
+        with tempfile.TemporaryDirectory() as directory:
+            with EpisodeWriter(directory) as writer:
+                for i in range(len(sim.games)):
+                    writer.append_columns(sim.episode(i))
+            dataset = EpisodeDataset(directory)
+            assert len(dataset) == sim.decisions
+            episode = dataset.episode(3)
+            assert (np.diff(episode["turn"]) > 0).all()
+            assert set(episode["outcome"][episode["seat"] == sim.winners[3]]) == {1}
+            assert set(episode["outcome"][episode["seat"] != sim.winners[3]]) == {-1}
@@ -0,0 +1,39 @@
+import collections
+import random
+
+from sim.belief import BeliefTracker
+from sim.cpu import CPUSim
+
+
+class Reshuffles(BeliefTracker):
+    count = 0
+
+    def reshuffled(self):
+        Reshuffles.count += 1
+        super().reshuffled()
+
+
+if __name__ == "__main__":
+    for players in (2, 3):
+        for seed in range(15):
+            sim = CPUSim(players, seed=seed)
+            game = sim.game
+            trackers = [Reshuffles.attach(game, player) for player in game.players]
+            while not game.winner():
+                sim.play_turn()
+                for tracker in trackers:
+                    hidden = collections.Counter(card.id for card in game.draw_pile)
+                    for player in game.players:
+                        if player != tracker.player:
+                            hidden.update(card.id for card in player.hand)
+                    assert collections.Counter(tracker.pool()) == hidden, (seed, game.turn_count)
+
+            tracker = trackers[0]
+            hands, draw_pile = tracker.sample_ids(random.Random(seed))
+            assert hands[0] == [card.id for card in game.players[0].hand]
+            assert [len(hand) for hand in hands] == [len(player.hand) for player in game.players]
+            assert len(draw_pile) == len(game.draw_pile)
+            assert sorted(sum(hands[1:], []) + draw_pile) == tracker.pool()
+            for tracker in trackers:
+                tracker.detach()
+    assert Reshuffles.count > 0  # the counts survived the discard pile going back into the draw pile
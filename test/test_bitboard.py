@@ -0,0 +1,41 @@
+import random
+
+from lib import matrix
+from lib.bitboard import BitBoard
+from lib.model import Board, Player, generate_deck
+
+
+if __name__ == "__main__":
+    players = [Player("0", "zero"), Player("1", "one"), Player("2", "two")]
+
+    def random_board(density):
+        board = Board.new_board()
+        for row in board.cells:
+            for cell in row:
+                if not cell.is_wild and random.random() < density:
+                    cell.player = random.choice(players)
+        return board
+
+    def test(density, win_count):
+        cells = random_board(density).cells
+        board, bits = Board(cells), BitBoard(cells)
+        for player in players:
+            def condition(cell):
+                return cell.player == player or cell.is_wild
+            expected = matrix.get_valid_sequences(cells, Board.SEQUENCE_LENGTH, condition, win_count)
+            found = tuple(bits.find_sequences_for_player(player, win_count))
+            assert len(found) == len(expected), (len(found), len(expected))
+            assert bits._sequences[player] == board._sequences[player]
+            assert bits._all_occupied(player) == board._all_occupied(player)
+            assert bits.hand_moves(deck, player) == board.hand_moves(deck, player)  # moves in the same order
+            assert bits.blocking_cells(player) == board.blocking_cells(player)
+            for k in range(1, Board.SEQUENCE_LENGTH + 1):
+                assert bits.cells_needing(player, k) == board.cells_needing(player, k)
+        assert bits._all_unoccupied() == board._all_unoccupied()
+
+    deck = generate_deck()
+    random.seed(0)
+    for density in (0.1, 0.3, 0.5, 0.7, 0.9):
+        for _ in range(20):
+            test(density, 1)
+            test(density, 2)
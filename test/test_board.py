@@ -0,0 +1,79 @@
+import pickle
+import random
+
+from lib.arrayboard import ArrayBoard
+from lib.bitboard import BitBoard
+from lib.game import Game
+from lib.model import Board, Move, generate_deck
+
+
+if __name__ == "__main__":
+
+    def snapshot(board):
+        return (
+            [[cell.player for cell in row] for row in board.cells],
+            {p: set(lines) for p, lines in board._sequences.items() if lines},
+            board.hand_moves(generate_deck(), None).moves,  # open and occupied cells, by the cards claiming them
+            board.zobrist,
+        )
+
+    def random_move(board, player, hand):
+        card, (row, column) = random.choice(list(board.hand_moves(hand, player).pairs()))
+        return Move(player, card, row, column)
+
+    def test_apply_undo(board_cls, turns):
+        game = Game(["a", "b", "c"], board_cls=board_cls)
+        board = game.board
+        history = []
+        for _ in range(turns):
+            player = game.next_player()
+            history.append(snapshot(board))
+            board.apply(random_move(board, player, generate_deck()))
+            rebuilt = board_cls([[cell for cell in row] for row in board.cells])
+            assert snapshot(board)[1:] == snapshot(rebuilt)[1:]
+        while history:
+            board.undo()
+            assert snapshot(board) == history.pop()
+
+    def test_clone(board_cls):
+        game = Game(["a", "b"], board_cls=board_cls)
+        for _ in range(30):
+            player = game.next_player()
+            game.board.apply(random_move(game.board, player, generate_deck()))
+        before = snapshot(game.board)
+        hands = [list(p.hand) for p in game.players]
+        clone = game.clone()
+        for _ in range(30):
+            player = clone.next_player()
+            try:
+                move = random_move(clone.board, player, player.hand)
+            except IndexError:  # only dead cards in hand
+                continue
+            clone.take_turn(move.row, move.column, move.card, player)
+        assert snapshot(game.board) == before
+        assert [p.hand for p in game.players] == hands
+
+    def test_pickle(board_cls):
+        game = Game(["a", "b", "c"], board_cls=board_cls)
+        for _ in range(40):
+            player = game.next_player()
+            game.board.apply(random_move(game.board, player, generate_deck()))
+        data = pickle.dumps(game.board)
+        assert b"_line_counters" not in data and b"_line_table" not in data  # derived tables are rebuilt instead
+        board = pickle.loads(data)
+        assert type(board) is board_cls
+        assert snapshot(board) == snapshot(game.board)
+        assert board.cells[0][0].is_wild
+        assert board.lines_needing(game.players[0], 2) == game.board.lines_needing(game.players[0], 2)
+        board.undo()  # the history survives too
+        game.board.undo()
+        assert snapshot(board) == snapshot(game.board)
+        if board_cls is ArrayBoard:
+            assert (board.array == game.board.array).all()
+
+    random.seed(0)
+    for board_cls in (Board, BitBoard, ArrayBoard):
+        for _ in range(10):
+            test_apply_undo(board_cls, 80)
+            test_clone(board_cls)
+        test_pickle(board_cls)
@@ -0,0 +1,20 @@
+import random
+
+from sim.cpu import CPUSim
+from sim.headless import HeadlessSim
+from sim.strategy import RandomStrategy, StrategyProvider
+
+
+if __name__ == "__main__":
+    for players in (2, 3):
+        for seed in range(100):
+            HeadlessSim(players, seed=seed).run(cross_check=True)
+
+    # given the same strategies, both engines play the same games
+    for seed in range(30):
+        cpu = CPUSim(2, StrategyProvider.constant(RandomStrategy(random.Random(seed))), seed=seed)
+        cpu.run()
+        headless = HeadlessSim(2, StrategyProvider.constant(RandomStrategy(random.Random(seed))), seed=seed)
+        headless.run()
+        assert cpu.game.turn_count == headless.game.turn_count
+        assert cpu.game.players.index(cpu.game.winner()[0]) == headless.game.winner
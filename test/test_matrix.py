@@ -12,7 +12,7 @@ if __name__ == "__main__":
             outrows.append(["0" for char in range(len(input_matrix[row]))])
         matrix = outrows
         for coords in coords_list:
-            for (r,c), _ in coords:
+            for r, c in coords:
                 matrix[r][c] = "1"
         matrix = ["".join(row) for row in matrix]
         return "\n".join(matrix) + "\n"
@@ -73,3 +73,22 @@ if __name__ == "__main__":
         0000000000
         """  # 8-sequence overlaps too much
     test(not_quite_two, 1, 2)
+
+    long_runs = """
+        1111111111
+        1000000001
+        1000000001
+        1000000001
+        1000000001
+        1000000001
+        1000000001
+        1000000001
+        1000000001
+        1111111111
+        """  # four 10-sequences, each holds two 5-sequences sharing at most a corner
+    test(long_runs, 8, 8)
+    test(long_runs, 8, 9)
+
+    full = "\n".join(["1111111111"] * 10)  # too many candidates to search combinatorially
+    test(full, 40, 40)
+    test(full, 0, 0)
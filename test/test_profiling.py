@@ -0,0 +1,39 @@
+import math
+
+from sim.cpu import CPUSim
+from sim.profiling import PhaseProfile
+
+
+if __name__ == "__main__":
+    profiles = []
+    for seed in range(5):
+        profile = PhaseProfile()
+        sim = CPUSim(2 + seed % 2, seed=seed, profile=profile)
+        sim.run()
+        game = sim.game
+        counters = profile.counters
+        turns = counters["turns"]
+        assert turns == game.turns_started
+        assert turns - counters["passes"] == game.turn_count
+        # every turn exchanges dead cards and works out the legal moves, passed turns included
+        assert profile.calls["exchange"] == profile.calls["legal_moves"] == turns
+        # a card is selected, captured and played for every turn that was not passed, retries included
+        played = game.turn_count + counters["invalid_selections"]
+        assert profile.calls["select"] == profile.calls["capture"] == profile.calls["take_turn"] == played
+        # the winner is checked before every turn and once more after the last
+        assert profile.calls["winner"] == turns + 1
+        assert set(profile.calls) == set(CPUSim.PHASES)
+        assert profile.games == 1
+        profiles.append(profile)
+
+    total = PhaseProfile.total(profiles)
+    summary = total.to_dict()
+    assert summary["games"] == 5
+    assert summary["counters"]["turns"] == sum(p.counters["turns"] for p in profiles)
+    for phase, data in summary["phases"].items():
+        assert data["calls"] == sum(p.calls[phase] for p in profiles)
+    assert math.isclose(sum(data["share"] for data in summary["phases"].values()), 1.0)
+
+    # without a profile the phases run untimed
+    sim = CPUSim(2, seed=0)
+    assert sim.run() == CPUSim(2, seed=0, profile=PhaseProfile()).run()
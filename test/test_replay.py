@@ -0,0 +1,142 @@
+import json
+import random
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from lib.game import Game
+from lib.model import Board, Card
+from sim.cpu import CPUSim
+from sim.replay import EpisodeDataset, EpisodeWriter, FIELDS, FORMAT_FILE, NO_CARD, import_pickles
+from sim.strategy import RandomStrategy, StrategyProvider
+
+
+LEGACY_PICKLES = Path(__file__).parent / "fixtures" / "legacy_pickles"
+
+
+def read_columns(directory: Path):
+    description = json.loads((directory / FORMAT_FILE).read_text())["fields"]
+    shards = sorted(p for p in directory.iterdir() if p.is_dir())
+    columns = {}
+    for name, field in description.items():
+        parts = [
+            np.fromfile(shard / f"{name}.bin", dtype=field["dtype"]).reshape([-1] + field["shape"])
+            for shard in shards
+        ]
+        columns[name] = np.concatenate(parts)
+    return columns, len(shards)
+
+
+def replay(columns, game_index, players, seed):
+    """Play the recorded actions of one game through `Game` and check every recorded state against it
+    """
+    game = Game(list(CPUSim.CPU_NAMES[:players]), seed=seed)
+    records = np.flatnonzero(columns["game"] == game_index)
+    for i in records:
+        # passed turns are not recorded, whoever had no playable card only exchanged dead cards
+        while game.turns_started <= columns["turn"][i]:
+            player = game.next_player()
+            game.exchange_dead_cards(player)
+        seat = game.players.index(player)
+        assert columns["seat"][i] == seat
+        hand = [int(card_id) for card_id in columns["hand"][i] if card_id != NO_CARD]
+        assert hand == [card.id for card in player.hand], (game_index, i)
+        for r, row in enumerate(game.board.cells):
+            for c, cell in enumerate(row):
+                expected = (game.players.index(cell.player) - seat) % players + 1 if cell.is_occupied else 0
+                assert columns["board"][i, r, c] == expected
+        row, column = divmod(int(columns["cell"][i]), Board.COLUMNS)
+        game.take_turn(row, column, Card.from_id(int(columns["card"][i])), player)
+    winner = game.winner()
+    assert winner is not None
+    winning_seat = game.players.index(winner[0])
+    for i in records:
+        assert columns["outcome"][i] == (1 if columns["seat"][i] == winning_seat else -1)
+
+
+def check_dataset(directory: Path, columns):
+    dataset = EpisodeDataset(directory)
+    assert len(dataset) == len(columns["game"])
+    for i in (0, len(dataset) // 2, -1):
+        record = dataset[i]
+        for name, values in columns.items():
+            assert np.array_equal(record[name], values[i])
+    for game in dataset.games:
+        episode = dataset.episode(game)
+        selected = columns["game"] == game
+        for name, values in columns.items():
+            assert np.array_equal(episode[name], values[selected])
+        assert isinstance(episode["board"].base, np.memmap)  # a view, not a copy
+        turn = int(episode["turn"][3])
+        assert np.array_equal(dataset.step(game, turn)["board"], episode["board"][3])
+    seen = []
+    for batch in dataset.batches(64, seed=1):
+        assert len(batch["board"]) <= 64
+        seen.extend(zip(batch["game"].tolist(), batch["turn"].tolist()))
+    assert sorted(seen) == sorted(zip(columns["game"].tolist(), columns["turn"].tolist()))
+    assert len(seen) == len(set(seen))
+
+
+def check_import_pickles(players):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "pickles").mkdir()
+        with EpisodeWriter(tmp / "episodes") as writer:
+            for index in range(5):
+                sim = CPUSim(players, seed=index)
+                sim.run()
+                writer.append(index, sim.outcomes())
+                with open(tmp / "pickles" / f"{index}.pickle", "wb") as f:
+                    sim.save_buffers(f)
+        import_pickles(tmp / "pickles", tmp / "imported")
+        expected, imported = EpisodeDataset(tmp / "episodes"), EpisodeDataset(tmp / "imported")
+        assert len(expected) == len(imported)
+        for index in range(5):
+            for name, values in expected.episode(index).items():
+                assert np.array_equal(imported.episode(index)[name], values), name
+
+
+
+def check_legacy_pickles():
+    """Import pickles written by sim/play.py before this series: dataclass cards, states without turn or action,
+    and boards numbering the other players rotated the wrong way round. The fixture holds a 2 and a 3 player game.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = import_pickles(LEGACY_PICKLES, tmp)
+        legacy = EpisodeDataset(tmp)
+        assert len(legacy) == writer.records > 0
+        for index, players in enumerate((2, 3)):
+            episode = legacy.episode(index)
+            assert (episode["card"] == NO_CARD).all() and (episode["hand"] == NO_CARD).all()
+            assert (episode["outcome"] == 0).all()
+            assert (episode["seat"] == np.arange(len(episode["seat"])) % players).all()
+            # in seat numbers, each board is the previous one plus the previous player's move
+            seats = episode["seat"][:, None, None]
+            boards = np.where(episode["board"] > 0, (episode["board"] - 1 + seats) % players + 1, 0)
+            for turn in range(1, len(boards)):
+                changed = np.flatnonzero(boards[turn] != boards[turn - 1])
+                assert len(changed) == 1, (index, turn, changed)
+                assert boards[turn].flat[changed[0]] in (0, episode["seat"][turn - 1] + 1), (index, turn)
+
+
+if __name__ == "__main__":
+    for players in (2, 3):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            with EpisodeWriter(directory, shard_size=500) as writer:
+                for index in range(10):
+                    # keep the game rng for the deck only, so that Game(seed=index) deals the same cards
+                    strategies = StrategyProvider.constant(RandomStrategy(random.Random(index)))
+                    sim = CPUSim(players, strategies, seed=index)
+                    sim.run()
+                    writer.append(index, sim.outcomes())
+            columns, shard_count = read_columns(directory)
+            assert shard_count == len(writer.shards) > 1
+            assert all(len(values) == writer.records for values in columns.values())
+            assert set(columns) == set(FIELDS)
+            for index in range(10):
+                replay(columns, index, players, seed=index)
+            check_dataset(directory, columns)
+        check_import_pickles(players)
+    check_legacy_pickles()
@@ -0,0 +1,49 @@
+import random
+import statistics
+
+from sim.stats import P2Quantile, RunningStats, WinRates
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    values = [rng.expovariate(1.0) for _ in range(20000)]
+
+    stats = RunningStats()
+    for x in values:
+        stats.add(x)
+    assert abs(stats.mean - statistics.mean(values)) < 1e-9
+    assert abs(stats.variance - statistics.variance(values)) < 1e-9
+    assert stats.min == min(values) and stats.max == max(values)
+
+    left, right = RunningStats(), RunningStats()
+    for x in values[:7000]:
+        left.add(x)
+    for x in values[7000:]:
+        right.add(x)
+    left.merge(right)
+    assert left.count == stats.count
+    assert abs(left.mean - stats.mean) < 1e-9 and abs(left.variance - stats.variance) < 1e-9
+
+    ordered = sorted(values)
+    for p in (0.1, 0.5, 0.9, 0.99):
+        quantile = P2Quantile(p)
+        for x in values:
+            quantile.add(x)
+        exact = ordered[int(p * len(ordered))]
+        assert abs(quantile.value - exact) < 0.02 * max(exact, 1), (p, quantile.value, exact)
+    small = P2Quantile(0.5)
+    for x in (3, 1, 2):
+        small.add(x)
+    assert small.value == 2
+
+    wins = WinRates(2)
+    for _ in range(4000):
+        wins.add(0 if rng.random() < 0.6 else 1)
+    low, high = wins.interval(0)
+    assert low < 0.6 < high and high - low < 0.04
+    assert abs(wins.rate(0) + wins.rate(1) - 1) < 1e-12
+    never = WinRates(3)
+    for seat in (0, 1) * 50:
+        never.add(seat)
+    low, high = never.interval(2)
+    assert low == 0 or low < 1e-12 and 0 < high < 0.05
@@ -0,0 +1,124 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.game import Game
+from lib.model import Card, Rank, Suit
+from sim.cpu import CPUSim
+from sim import alphabeta, experiment, ismcts
+from sim.experiment import STRATEGIES, Condition, ConditionResult, conditions_for, play_games
+from sim.headless import HeadlessGame
+from sim.strategy import GreedyStrategy, AlphaBetaStrategy, ISMCTSStrategy, RandomStrategy, StrategyProvider, TurnView
+
+
+def claim(game, player, cells):
+    for r, c in cells:
+        game.board.claim_cell(player, game.board.cells[r][c].card, r, c)
+
+
+if __name__ == "__main__":
+    game = Game(["Abbott", "Bionicle"], seed=0)
+    me, you = game.players
+    claim(game, me, [(1, 1), (1, 2), (1, 3)])  # needs (1, 4) and (1, 5), or (1, 0) and (1, 4)
+    claim(game, you, [(5, 1), (5, 2), (5, 3), (5, 4)])  # completes with (5, 0) or (5, 5)
+    view = TurnView(game, me)
+    assert view.blocking_cells == {(5, 0), (5, 5)}
+    assert view.completing_cells == set()
+    assert (1, 4) in view.cells_needing(2)
+    assert view.line_counts[2] >= 1
+    assert view.cells_needing(2) is view.cells_needing(2)  # cached for the turn
+    assert view.legal_moves is view.legal_moves
+
+    # a two-eyed jack can go anywhere, greedy blocks with it when nothing completes
+    me.hand = [Card(Suit.DIAMONDS, Rank.JACK)]
+    card, cell = GreedyStrategy(random.Random(0)).choose(TurnView(game, me))
+    assert cell in {(5, 0), (5, 5)}
+    # and completes its own sequence before blocking
+    claim(game, me, [(1, 4)])
+    card, cell = GreedyStrategy(random.Random(0)).choose(TurnView(game, me))
+    assert cell in {(1, 0), (1, 5)}, cell
+
+    # determinizing only redeals the cards the observer cannot see
+    root = HeadlessGame.from_game(game)
+    sample = ismcts.determinize(root, 0, random.Random(0))
+    assert sample.hands[0] == root.hands[0]
+    assert sorted(sample.hands[1] + list(sample._deck[sample._cursor:])) == \
+        sorted(root.hands[1] + list(root._deck[root._cursor:]))
+
+    # with a sequence already made, the search finds the winning cell
+    claim(game, me, [(8, 1), (8, 2), (8, 3), (8, 4), (8, 5)])
+    me.hand = [game.board.cells[3][3].card, game.board.cells[1][5].card]
+    search = ISMCTSStrategy(random.Random(0), iterations=200)
+    card, cell = search.choose(TurnView(game, me))
+    assert cell == (1, 5), cell
+    assert search.report()["moves"] == 1 and search.report()["playouts"] == 200
+
+    # on worker processes the iterations are split between the workers, and equal seeds give equal searches
+    root = HeadlessGame.from_game(game)
+    actions = [(card.id, r * game.board.COLUMNS + c) for card, (r, c) in TurnView(game, me).move_pairs]
+    with ProcessPoolExecutor(2) as executor:
+        first, second = [ismcts.parallel_search(executor, 2, root, 0, actions, iterations=101, seed=1) for _ in "ab"]
+    assert first.iterations == 101 and first.visits == second.visits
+    with ISMCTSStrategy(random.Random(0), iterations=200, workers=2) as parallel:
+        card, cell = parallel.choose(TurnView(game, me))
+        assert parallel._executor is not None
+    assert cell == (1, 5), cell
+    assert parallel._executor is None and parallel.report()["playouts"] == 200
+
+    # so does alpha-beta, and it blocks an opponent one cell from winning before extending its own lines
+    searcher = AlphaBetaStrategy(random.Random(0), time_budget=None, max_depth=2)
+    card, cell = searcher.choose(TurnView(game, me))
+    assert cell == (1, 5), cell
+    assert game.board.count_lines_needing(you, 1) == 2
+    claim(game, you, [(6, 1), (6, 2), (6, 3), (6, 4), (6, 5)])  # a sequence, the row 5 threat now wins
+    me.hand = [game.board.cells[3][3].card, game.board.cells[5][5].card]
+    card, cell = searcher.choose(TurnView(game, me))
+    assert cell == (5, 5), cell
+    assert searcher.report()["max_depth"] == 2
+    # the shared table holds values for the seat that searched, the other seat searches its own
+    you.hand = [game.board.cells[3][3].card, game.board.cells[5][5].card]
+    card, cell = searcher.choose(TurnView(game, you))
+    assert cell == (5, 5), cell
+    # and a win cached at one ply reads as the same distance from the node at any other
+    assert alphabeta._from_cache(alphabeta._to_cache(alphabeta.WIN - 5, 3), 1) == alphabeta.WIN - 3
+    assert alphabeta._from_cache(alphabeta._to_cache(-alphabeta.WIN + 4, 4), 0) == -alphabeta.WIN
+
+    # the search strategies are registered with fixed budgets, for the cpu engine only
+    assert STRATEGIES["ismcts"].is_board_aware() and STRATEGIES["alphabeta"].is_board_aware()
+    try:
+        conditions_for([2], ["ismcts,alphabeta"], engine="headless")
+        assert False, "the headless engine cannot run search strategies"
+    except ValueError:
+        pass
+    for argv in (["--pairings", "greedy"], ["--pairings", "nope", "--engine", "cpu"]):
+        try:
+            experiment.main(argv)
+            assert False, argv
+        except SystemExit as e:
+            assert e.code == 2  # a usage error, before any game is played
+    [(turns, _, winner)] = play_games(conditions_for([2], ["alphabeta,random"])[0], range(1), "cpu")
+    assert winner is not None and turns > 0
+
+    # a strategy playing several seats gets one win rate over all of them
+    result = ConditionResult(Condition(4, ("random", "greedy", "random")))
+    for winner in (0, 1, 2, 3, None):
+        result.add((10, 0.0, winner))
+    rates = result.to_dict()["strategy_win_rates"]
+    assert list(rates) == ["random", "greedy"]
+    assert rates["random"]["wins"] == 3 and rates["greedy"]["wins"] == 1
+    assert sum(seat["wins"] for seat in result.to_dict()["win_rates"]["seats"]) == 4
+
+    # the default choose keeps strategies that only see card and move lists working
+    card, cell = RandomStrategy(random.Random(0)).choose(TurnView(game, me))
+    assert cell in TurnView(game, me).moves_for(card)
+
+    wins = 0
+    for seed in range(40):
+        strategies = [GreedyStrategy(random.Random(seed)), RandomStrategy(random.Random(seed))]
+        if seed % 2:
+            strategies.reverse()
+        by_name = dict(zip(CPUSim.CPU_NAMES, strategies))
+        sim = CPUSim(2, StrategyProvider(by_name.__getitem__), seed=seed)
+        sim.run()
+        winner = sim.game.winner()[0]
+        wins += isinstance(by_name[winner.name], GreedyStrategy)
+    assert wins > 30, wins
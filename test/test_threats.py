@@ -0,0 +1,95 @@
+import random
+
+from lib.arrayboard import ArrayBoard
+from lib.bitboard import BitBoard
+from lib.model import Board, Card, Move, Player, Rank, Suit
+from lib.threats import BLOCKED
+
+ONE_EYED = Card(Suit.SPADES, Rank.JACK)
+TWO_EYED = Card(Suit.DIAMONDS, Rank.JACK)
+
+
+if __name__ == "__main__":
+
+    def brute_need(board, player, line):
+        """Recount a line cell by cell, the way `LineCounters.need` is meant to see it"""
+        owners = [board.cells[r][c].player for r, c in line]
+        if any(owner is not None and owner != player for owner in owners):
+            return BLOCKED
+        filled = sum(owner == player or board.cells[r][c].is_wild for owner, (r, c) in zip(owners, line))
+        return board.SEQUENCE_LENGTH - filled
+
+    def brute_completing(board, player):
+        return {
+            (r, c)
+            for line in board._line_table.lines if brute_need(board, player, line) == 1
+            for r, c in line if board.cells[r][c].player is None and not board.cells[r][c].is_wild
+        }
+
+    def check(board, players):
+        lines = board._line_table.lines
+        counters = board._line_counters
+        for player in players:
+            needs = [brute_need(board, player, line) for line in lines]
+            for i, need in enumerate(needs):
+                assert counters.need(player, i) == need, (player, lines[i], counters.need(player, i), need)
+                owned = sum(board.cells[r][c].player == player for r, c in lines[i])
+                assert counters.owned(player, i) == owned
+            for k in range(board.SEQUENCE_LENGTH + 1):
+                expected = [line for line, need in zip(lines, needs) if need == k]
+                assert board.lines_needing(player, k) == expected, (player, k)
+                assert board.count_lines_needing(player, k) == len(expected)
+            assert board.completing_cells(player) == brute_completing(board, player)
+            on_board = {cell.player for row in board.cells for cell in row} - {None, player}
+            blocking = set().union(*(brute_completing(board, p) for p in on_board))
+            assert board.blocking_cells(player) == blocking, player
+
+    def random_move(board, player, rng):
+        """Mostly plays a cell's own card or a two-eyed jack, sometimes removes an opponent's chip"""
+        opponents = [
+            (r, c) for r, row in enumerate(board.cells) for c, cell in enumerate(row)
+            if cell.player is not None and cell.player != player
+        ]
+        if opponents and rng.random() < 0.2:
+            row, column = rng.choice(opponents)
+            return Move(player, ONE_EYED, row, column)
+        row, column = rng.choice(board._all_unoccupied())
+        card = TWO_EYED if rng.random() < 0.1 else board.cells[row][column].card
+        return Move(player, card, row, column)
+
+    def test_claims(board_cls, players, turns, rng, first_check):
+        """claim_cell and one-eyed removals, checking only from first_check on so that counters start tracking
+        players mid-game
+        """
+        board = board_cls.new_board()
+        for turn in range(turns):
+            move = random_move(board, players[turn % len(players)], rng)
+            board.claim_cell(move.player, move.card, move.row, move.column)
+            if turn >= first_check:
+                check(board, players)
+
+    def test_undo(board_cls, players, turns, rng):
+        board = board_cls.new_board()
+        check(board, players)
+        applied = 0
+        for turn in range(turns):
+            if applied and rng.random() < 0.3:
+                board.undo()
+                applied -= 1
+            else:
+                board.apply(random_move(board, players[turn % len(players)], rng))
+                applied += 1
+            check(board, players)
+        while applied:
+            board.undo()
+            applied -= 1
+            check(board, players)
+        assert all(cell.player is None for row in board.cells for cell in row)
+
+    rng = random.Random(0)
+    for board_cls in (Board, BitBoard, ArrayBoard):
+        for count in (2, 3):
+            players = [Player(str(i), f"p{i}") for i in range(count)]
+            test_claims(board_cls, players, 60, rng, first_check=0)
+            test_claims(board_cls, players, 60, rng, first_check=30)
+            test_undo(board_cls, players, 60, rng)
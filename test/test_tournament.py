@@ -0,0 +1,41 @@
+import math
+
+from sim.tournament import SPRT, Pairing, PairingResult, TournamentConfig, fit_ratings, pairings_for, run_tournament
+
+
+def result(a, b, wins_a, wins_b, draws=0):
+    r = PairingResult(Pairing(2, (a, b)))
+    r.wins = [wins_a, wins_b]
+    r.draws = draws
+    return r
+
+
+if __name__ == "__main__":
+    # every seat is played by both strategies, and each holds half the seats over all orders
+    for players in (2, 3, 4, 9):
+        orders = Pairing(players, ("a", "b")).seat_orders()
+        assert all({order[seat] for order in orders} == {0, 1} for seat in range(players))
+        assert sum(map(sum, orders)) * 2 == players * len(orders)
+
+    sprt = SPRT(-30, 30, 0.05, 0.05)
+    assert sprt.decide(0, 0) is None
+    assert sprt.decide(60, 20) is True and sprt.decide(20, 60) is False
+    assert sprt.decide(50, 50) is None
+    assert math.isclose(sprt.llr(10, 10), 0, abs_tol=1e-12)
+
+    # 75% against one opponent is 400 * log10(3) Elo, a little less with the virtual draw
+    ratings = fit_ratings([result("a", "b", 7500, 2500)])
+    assert 185 < ratings["a"] - ratings["b"] < 400 * math.log10(3), ratings
+    assert math.isclose(sum(ratings.values()) / 2, 1500)
+    # ratings are transitive through a common opponent, and a strategy that never won stays finite
+    ratings = fit_ratings([result("a", "b", 500, 500), result("b", "c", 100, 0), result("a", "c", 100, 0)])
+    assert math.isclose(ratings["a"], ratings["b"], abs_tol=1e-6) and ratings["c"] < ratings["a"] - 300
+
+    # greedy is clearly stronger, and a process pool stops the pairings at the same games
+    pairings = pairings_for([2, 3], ["random", "greedy"])
+    local = run_tournament(pairings, TournamentConfig(max_games=200))
+    pooled = run_tournament(pairings, TournamentConfig(max_games=200, workers=2))
+    for a, b in zip(local, pooled):
+        assert a.pairing.strategies == ("random", "greedy") and a.decision is False
+        assert (a.wins, a.draws, a.turns.mean) == (b.wins, b.draws, b.turns.mean)
+        assert a.games < 200
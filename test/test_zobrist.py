@@ -0,0 +1,82 @@
+import random
+
+from lib.game import Game
+from lib.model import Card, Move, Rank, Suit
+from lib.zobrist import TranspositionCache
+
+ONE_EYED = Card(Suit.HEARTS, Rank.JACK)
+
+
+if __name__ == "__main__":
+    # the least recently used entry goes first, and only one goes at a time
+    cache = TranspositionCache(maxsize=3)
+    for position in "abc":
+        cache.put(position, position.upper())
+    cache.put("d", "D")
+    assert len(cache) == 3
+    assert "a" not in cache and list(cache._entries) == ["b", "c", "d"]
+
+    # get makes an entry the most recent, so the next eviction passes it over
+    assert cache.get("b") == "B"
+    cache.put("e", "E")
+    assert "b" in cache and "c" not in cache
+    assert list(cache._entries) == ["d", "b", "e"]
+
+    # so does put on an existing entry, which does not grow the cache
+    cache.put("d", "D2")
+    assert len(cache) == 3 and list(cache._entries) == ["b", "e", "d"]
+    assert cache.get("missing") is None and cache.get("d") == "D2"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # get_or_compute only computes on a miss
+    calls = []
+    assert cache.get_or_compute("f", lambda: calls.append(1) or "F") == "F"
+    assert cache.get_or_compute("f", lambda: calls.append(1) or "G") == "F"
+    assert len(calls) == 1
+
+    # the size bound holds under any mix of puts and gets
+    rng = random.Random(0)
+    cache = TranspositionCache(maxsize=50)
+    for _ in range(2000):
+        position = rng.randrange(200)
+        if rng.random() < 0.5:
+            cache.put(position, position)
+        else:
+            assert cache.get(position) in (None, position)
+        assert len(cache) <= 50
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == cache.misses == 0
+
+    # a board's hash returns to its old value after apply and undo, one-eyed jack removals included
+    game = Game(["a", "b", "c"], seed=0)
+    board = game.board
+    history = []
+    for turn in range(60):
+        player = game.next_player()
+        opponents = sorted(
+            (r, c) for r, row in enumerate(board.cells) for c, cell in enumerate(row)
+            if cell.player is not None and cell.player != player
+        )
+        if opponents and turn % 4 == 3:
+            row, column = rng.choice(opponents)
+            move = Move(player, ONE_EYED, row, column)
+        else:
+            row, column = rng.choice(board._all_unoccupied())
+            move = Move(player, board.cells[row][column].card, row, column)
+        history.append(board.zobrist)
+        board.apply(move)
+        assert board.zobrist != history[-1]
+        assert board.zobrist == type(board)([list(row) for row in board.cells]).zobrist
+    while history:
+        board.undo()
+        assert board.zobrist == history.pop()
+    assert board.zobrist == 0
+
+    # removing a chip and claiming the cell back restores the hash too
+    player, opponent = game.players[:2]
+    board.claim_cell(player, board.cells[1][1].card, 1, 1)
+    claimed = board.zobrist
+    board.claim_cell(opponent, ONE_EYED, 1, 1)
+    assert board.zobrist == 0
+    board.claim_cell(player, board.cells[1][1].card, 1, 1)
+    assert board.zobrist == claimed